@@ -0,0 +1,50 @@
+"""Spread pages.sort_order into gap-based keys and index (site_id, sort_order).
+
+Revision ID: 003_page_sort_order_gaps
+Revises: 002_add_imported_fields
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision = "003_page_sort_order_gaps"
+down_revision = "002_add_imported_fields"
+branch_labels = None
+depends_on = None
+
+SORT_ORDER_GAP = 1024
+
+
+def _index_exists(index_name: str) -> bool:
+    """Check if an index already exists."""
+    conn = op.get_bind()
+    result = conn.execute(
+        sa.text("SELECT EXISTS (SELECT 1 FROM pg_indexes WHERE indexname = :i)"),
+        {"i": index_name},
+    )
+    return result.scalar()
+
+
+def upgrade() -> None:
+    # Existing pages all have sort_order = 0 — number them by creation time,
+    # leaving SORT_ORDER_GAP free keys between neighbours for cheap moves.
+    op.execute(
+        sa.text(
+            "UPDATE pages SET sort_order = ranked.rn * :gap "
+            "FROM ("
+            "  SELECT id, row_number() OVER ("
+            "    PARTITION BY site_id ORDER BY sort_order, created_at"
+            "  ) AS rn FROM pages"
+            ") AS ranked "
+            "WHERE pages.id = ranked.id"
+        ).bindparams(gap=SORT_ORDER_GAP)
+    )
+
+    if not _index_exists("ix_pages_site_id_sort_order"):
+        op.create_index("ix_pages_site_id_sort_order", "pages", ["site_id", "sort_order"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_pages_site_id_sort_order", table_name="pages")
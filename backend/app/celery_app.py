@@ -10,6 +10,7 @@ celery_app = Celery(
     "sitebuilder",
     broker=settings.redis_url,
     backend=settings.redis_url,
+    include=["app.tasks.images"],
 )
 
 celery_app.conf.update(
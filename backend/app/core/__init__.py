@@ -18,6 +18,23 @@ class Settings(BaseSettings):
     # JWT (external auth from parent project)
     JWT_SECRET_KEY: str = "change-me-in-production"
     JWT_ALGORITHM: str = "HS256"
+    # Older secrets still accepted while the parent rotates keys (comma-separated)
+    JWT_PREVIOUS_SECRET_KEYS: str = ""
+    # JWKS endpoint of the parent (asymmetric keys, selected by token `kid`)
+    JWT_JWKS_URL: str = ""
+    JWT_AUDIENCE: str = ""
+    JWT_ISSUER: str = ""
+
+    # Auth mode: "remote" = validate every uncached token via EXTERNAL_AUTH_URL,
+    # "local" = verify JWT signature/expiry here, parent API only as fallback
+    AUTH_MODE: str = "remote"
+    # Coalesce concurrent validations of one token across workers with a Redis lock
+    AUTH_SINGLEFLIGHT_REDIS: bool = True
+    # In-process token cache (LRU) size and stale windows past the 5 min TTL:
+    # served while refreshing in the background / served if the parent is down
+    AUTH_CACHE_MAX_ENTRIES: int = 10000
+    AUTH_STALE_WHILE_REVALIDATE: int = 60  # seconds
+    AUTH_STALE_IF_ERROR: int = 300  # seconds
 
     # External auth service URL
     EXTERNAL_AUTH_URL: str = "https://app.akm-advisor.com"
@@ -39,6 +56,9 @@ class Settings(BaseSettings):
     REDIS_PORT: int = 6379
     REDIS_DB: int = 0
 
+    # Cached GET /sites/{id} responses (app/core/site_cache.py)
+    SITE_CACHE_TTL: int = 3600  # seconds
+
     # CORS
     CORS_ORIGINS: str = '["http://localhost:10669","http://localhost:3000"]'
 
@@ -47,18 +67,63 @@ class Settings(BaseSettings):
 
     # Agent project ID for validating agent keys via parent API (from AGENTS.md)
     AGENT_PROJECT_ID: str = "698427043be84d505d347aad"
+    # Cached parent agent-key validations (seconds) and parent calls per key per minute
+    AGENT_KEY_CACHE_TTL: int = 300
+    AGENT_KEY_NEGATIVE_TTL: int = 60
+    AGENT_KEY_VALIDATIONS_PER_MINUTE: int = 10
+
+    # Docker Engine API socket (container logs, nginx reload — app/core/docker.py)
+    DOCKER_SOCKET: str = "/var/run/docker.sock"
 
     # Server IP for DNS verification (A record check)
     SERVER_IP: str = ""
 
+    # Outbound HTTP clients (app/core/http.py) — pool limits are per upstream
+    HTTP_TIMEOUT: float = 10.0
+    HTTP_CONNECT_TIMEOUT: float = 3.0
+    HTTP_MAX_CONNECTIONS: int = 50
+    HTTP_MAX_KEEPALIVE: int = 20
+    HTTP_KEEPALIVE_EXPIRY: float = 30.0
+    HTTP_HTTP2: bool = False  # requires the 'h2' package
+
     # File upload
     MAX_UPLOAD_SIZE: int = 100 * 1024 * 1024  # 100MB
     UPLOAD_DIR: str = "/app/uploads"
-
+    # Resumable upload sessions expire this long after their last chunk
+    UPLOAD_SESSION_TTL: int = 24 * 3600  # seconds
+    # POST /uploads:batch — max files and total request size, files written to disk concurrently
+    UPLOAD_BATCH_MAX_FILES: int = 50
+    UPLOAD_BATCH_MAX_BYTES: int = 500 * 1024 * 1024  # 500MB
+    UPLOAD_BATCH_CONCURRENCY: int = 4
+    # Resized variants of uploaded images (app/tasks/images.py), comma-separated widths in px
+    IMAGE_VARIANT_WIDTHS: str = "320,640,960,1280,1920"
+    IMAGE_VARIANT_QUALITY: int = 80
+    # Also encode AVIF variants (needs Pillow >= 11.2 or the pillow-avif-plugin package)
+    IMAGE_VARIANT_AVIF: bool = False
+    # On-demand resizing (?w=&h=&fmt= on uploads): disk cache budget, parallel renders, max side
+    IMAGE_RESIZE_CACHE_BYTES: int = 1024 * 1024 * 1024  # 1GB
+    IMAGE_RESIZE_CONCURRENCY: int = 2
+    IMAGE_RESIZE_MAX_DIMENSION: int = 4096
+    # Requested w/h are rounded up to one of these (plus IMAGE_VARIANT_WIDTHS and the max side)
+    IMAGE_RESIZE_SIZES: str = "64,128,256,480"
+    # Serve upload bodies via nginx: X-Accel-Redirect to this internal location ("" = from Python)
+    UPLOAD_ACCEL_REDIRECT_PREFIX: str = ""
+    # Browser cache lifetime of uploads whose name is not a content hash
+    UPLOAD_CACHE_MAX_AGE: int = 24 * 3600  # seconds
+
+
+    # Application log pipeline: max records buffered for the writer thread (excess is dropped)
+    LOG_QUEUE_SIZE: int = 10000
+    # Per-minute log rollups kept in memory for GET /logs/app/stats
+    LOG_STATS_RETENTION_MINUTES: int = 24 * 60
 
     # Publish
     PUBLISH_DIR: str = "/app/published"
 
+    # Orphan cleanup (app/tasks/cleanup.py): ids per delete batch, pause between batches
+    GC_BATCH_SIZE: int = 500
+    GC_BATCH_PAUSE: float = 0.2
+
     @property
     def postgres_url(self) -> str:
         return (
@@ -1,24 +1,60 @@
 """
 JWT authentication - validates tokens via the parent project API (app.akm-advisor.com).
-Uses in-memory cache to avoid hitting external API on every request.
+With AUTH_MODE=local, tokens are verified here first (see app/core/jwt_local.py)
+and the parent API is only a fallback.
+
+Validation results are cached in two tiers so the parent API is called once
+per user rather than once per user per worker:
+- L1: in-process bounded LRU (AUTH_CACHE_MAX_ENTRIES), O(1) get/set/evict
+- L2: Redis, shared by all workers, keyed by sha256(token) (raw tokens are never stored)
+Rejected tokens are cached too (negative entries, short TTL).
+
+Valid L1 entries outlive their TTL as stale entries (never past the token's
+own expiry): within AUTH_STALE_WHILE_REVALIDATE they are served immediately
+while a background refresh runs, and within AUTH_STALE_IF_ERROR they are the
+fallback when the parent auth service is slow or down.
+
+Concurrent cache misses for the same token are coalesced (single-flight):
+one outbound /auth/me call per token per process, and with
+AUTH_SINGLEFLIGHT_REDIS also across workers via a short Redis lock.
+
+Users validated by the parent keep its full /auth/me payload (`profile`), so
+GET /auth/me is answered from the same cache (see get_user_profile).
 """
 
+import asyncio
+import hashlib
+import json
+import logging
 import time
-from typing import Dict, Tuple
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
 
 import httpx
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from jose import jwt
+from jose.exceptions import JWTError
+from redis.exceptions import RedisError
 
 from app.core import settings
+from app.core.http import get_http_client, PARENT
+from app.core.jwt_local import decode_token
+from app.core.redis import get_redis
 
+logger = logging.getLogger(__name__)
 
 security = HTTPBearer()
 
-# Cache: token -> (CurrentUser, expiry_timestamp)
 # TTL = 5 minutes — balance between security and performance
-_TOKEN_CACHE: Dict[str, Tuple["CurrentUser", float]] = {}
 _CACHE_TTL = 300  # seconds
+_NEGATIVE_CACHE_TTL = 30  # seconds — rejected tokens
+
+# Single-flight: token -> in-progress validation task
+_INFLIGHT: Dict[str, "asyncio.Task[CurrentUser]"] = {}
+_LOCK_TTL_MS = 5000  # cross-worker validation lock
+_LOCK_WAIT = 3.0  # seconds a follower waits for the lock holder's result
+_LOCK_POLL = 0.05  # seconds
 
 EXTERNAL_AUTH_ME = f"{settings.EXTERNAL_AUTH_URL}/api/v1/auth/me"
 
@@ -33,39 +69,171 @@ class CurrentUser:
         name: str = "",
         tenant_id: str = "",
         role: str = "",
+        profile: Optional[Dict[str, Any]] = None,
     ):
         self.user_id = user_id
         self.email = email
         self.name = name
         self.tenant_id = tenant_id
         self.role = role
+        # Full parent /auth/me payload; None when the token was verified locally
+        self.profile = profile
 
 
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-) -> CurrentUser:
+def _user_from_payload(data: dict, profile: bool = False) -> CurrentUser:
     """
-    Validate JWT token by calling the parent project's /api/v1/auth/me.
-    Results are cached for 5 minutes to reduce latency.
+    Build CurrentUser from a parent /auth/me response (profile=True keeps the
+    payload) or from JWT claims.
     """
-    token = credentials.credentials
+    return CurrentUser(
+        user_id=str(data.get("id") or data.get("sub") or data.get("user_id") or ""),
+        email=data.get("email", ""),
+        name=data.get("full_name", data.get("name", "")),
+        tenant_id=data.get("tenant_id", ""),
+        role=data.get("role", ""),
+        profile=data if profile else None,
+    )
+
+
+def _invalid_token() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid or expired token",
+    )
+
+
+# ── Two-tier token cache ──────────────────────────────────────────────────────
+
+class _TokenCache:
+    """
+    Bounded LRU: token -> (CurrentUser or None for rejected tokens, fresh_until, keep_until).
+    Entries are fresh until fresh_until and kept (stale) until keep_until;
+    the least recently used entry is evicted once maxsize is reached.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, Tuple[Optional[CurrentUser], float, float]]" = OrderedDict()
+
+    def get(self, token: str) -> Optional[Tuple[Optional[CurrentUser], float, float]]:
+        entry = self._entries.get(token)
+        if entry is None:
+            return None
+        if time.time() >= entry[2]:
+            del self._entries[token]
+            return None
+        self._entries.move_to_end(token)
+        return entry
+
+    def set(self, token: str, user: Optional[CurrentUser], fresh_until: float, keep_until: float):
+        self._entries[token] = (user, fresh_until, keep_until)
+        self._entries.move_to_end(token)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
 
-    # Check cache first
+
+_TOKEN_CACHE = _TokenCache(settings.AUTH_CACHE_MAX_ENTRIES)
+
+
+def _redis_key(token: str) -> str:
+    return "auth:tok:" + hashlib.sha256(token.encode()).hexdigest()
+
+
+def _token_exp(token: str) -> Optional[float]:
+    try:
+        exp = jwt.get_unverified_claims(token).get("exp")
+    except JWTError:
+        return None
+    return float(exp) if exp else None
+
+
+def _positive_ttl(token: str, exp: Optional[float] = None) -> float:
+    """Cache TTL for a valid token: _CACHE_TTL, but never past the token's own expiry."""
+    if exp is None:
+        exp = _token_exp(token)
+    ttl = float(_CACHE_TTL)
+    if exp:
+        ttl = min(ttl, float(exp) - time.time())
+    return ttl
+
+
+def _l1_set(token: str, user: Optional[CurrentUser], ttl: float):
+    """Store in L1; valid users are kept stale for AUTH_STALE_IF_ERROR, capped at token expiry."""
+    fresh_until = time.time() + ttl
+    keep_until = fresh_until
+    if user is not None:
+        keep_until += settings.AUTH_STALE_IF_ERROR
+        exp = _token_exp(token)
+        if exp:
+            keep_until = min(keep_until, exp)
+    _TOKEN_CACHE.set(token, user, fresh_until, keep_until)
+
+
+def _stale_get(token: str) -> Tuple[Optional[CurrentUser], bool]:
+    """
+    Return (user, revalidate) for a stale but kept valid L1 entry; revalidate is
+    True while the entry may be served without waiting for the parent.
+    """
+    entry = _TOKEN_CACHE.get(token)
+    if entry is None or entry[0] is None:
+        return None, False
+    user, fresh_until, _ = entry
+    return user, time.time() < fresh_until + settings.AUTH_STALE_WHILE_REVALIDATE
+
+
+async def _cache_get(token: str) -> Tuple[bool, Optional[CurrentUser]]:
+    """Return (hit, user) for a fresh entry. A hit with user=None is a cached rejection."""
     cached = _TOKEN_CACHE.get(token)
     if cached:
-        user, expires_at = cached
-        if time.time() < expires_at:
-            return user
-        else:
-            del _TOKEN_CACHE[token]
+        user, fresh_until, _ = cached
+        if time.time() < fresh_until:
+            return True, user
 
-    # Validate against external auth service
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.get(
-                EXTERNAL_AUTH_ME,
-                headers={"Authorization": f"Bearer {token}"},
-            )
+        redis = await get_redis()
+        key = _redis_key(token)
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.get(key)
+            pipe.pttl(key)
+            raw, pttl = await pipe.execute()
+    except RedisError as exc:
+        logger.warning(f"Auth cache unavailable: {exc}")
+        return False, None
+    if raw is None or pttl <= 0:
+        return False, None
+
+    data = json.loads(raw)
+    user = None if data.get("invalid") else CurrentUser(**data)
+    _l1_set(token, user, pttl / 1000)
+    return True, user
+
+
+async def _cache_set(token: str, user: Optional[CurrentUser], ttl: float):
+    """Store a validation result (user=None for a rejection) in both tiers."""
+    if ttl <= 0:
+        return
+    _l1_set(token, user, ttl)
+
+    value = {"invalid": True} if user is None else vars(user)
+    try:
+        redis = await get_redis()
+        await redis.set(_redis_key(token), json.dumps(value), px=int(ttl * 1000))
+    except RedisError as exc:
+        logger.warning(f"Auth cache store failed: {exc}")
+
+
+# ── Validation ────────────────────────────────────────────────────────────────
+
+async def _validate_remote(token: str) -> CurrentUser:
+    """Validate token against the parent /auth/me. Caches both outcomes."""
+    try:
+        response = await get_http_client(PARENT).get(
+            EXTERNAL_AUTH_ME,
+            headers={"Authorization": f"Bearer {token}"},
+        )
     except httpx.RequestError:
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
@@ -73,10 +241,8 @@ async def get_current_user(
         )
 
     if response.status_code == 401:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid or expired token",
-        )
+        await _cache_set(token, None, _NEGATIVE_CACHE_TTL)
+        raise _invalid_token()
 
     if response.status_code != 200:
         raise HTTPException(
@@ -84,14 +250,7 @@ async def get_current_user(
             detail=f"Auth service returned {response.status_code}",
         )
 
-    data = response.json()
-    user = CurrentUser(
-        user_id=str(data.get("id", data.get("sub", ""))),
-        email=data.get("email", ""),
-        name=data.get("full_name", data.get("name", "")),
-        tenant_id=data.get("tenant_id", ""),
-        role=data.get("role", ""),
-    )
+    user = _user_from_payload(response.json(), profile=True)
 
     if not user.user_id:
         raise HTTPException(
@@ -99,15 +258,140 @@ async def get_current_user(
             detail="Invalid token: missing user id",
         )
 
-    # Store in cache
-    _TOKEN_CACHE[token] = (user, time.time() + _CACHE_TTL)
+    await _cache_set(token, user, _positive_ttl(token))
+    return user
 
-    # Cleanup old entries (keep cache bounded)
-    if len(_TOKEN_CACHE) > 1000:
-        now = time.time()
-        expired = [k for k, (_, exp) in _TOKEN_CACHE.items() if exp < now]
-        for k in expired:
-            del _TOKEN_CACHE[k]
 
-    return user
+async def _validate_remote_locked(token: str) -> CurrentUser:
+    """
+    _validate_remote guarded by a short Redis lock, so only one worker calls
+    the parent per token. Followers poll the shared cache for the result and
+    validate themselves only if the holder does not deliver in time.
+    Like _validate_remote, the result always carries the parent profile.
+    """
+    if not settings.AUTH_SINGLEFLIGHT_REDIS:
+        return await _validate_remote(token)
+
+    lock_key = _redis_key(token) + ":lock"
+    try:
+        redis = await get_redis()
+        acquired = await redis.set(lock_key, "1", nx=True, px=_LOCK_TTL_MS)
+    except RedisError:
+        return await _validate_remote(token)
+
+    if not acquired:
+        deadline = time.monotonic() + _LOCK_WAIT
+        while time.monotonic() < deadline:
+            await asyncio.sleep(_LOCK_POLL)
+            hit, user = await _cache_get(token)
+            if hit:
+                if user is None:
+                    raise _invalid_token()
+                # Entries from local verification (AUTH_MODE=local) have no
+                # profile — keep waiting for the holder's parent result
+                if user.profile is not None:
+                    return user
+        return await _validate_remote(token)
+
+    try:
+        return await _validate_remote(token)
+    finally:
+        try:
+            await redis.delete(lock_key)
+        except RedisError:
+            pass  # expires on its own
+
+
+def _inflight(token: str) -> "asyncio.Task[CurrentUser]":
+    """Return the in-flight validation task for token, starting one if needed."""
+    task = _INFLIGHT.get(token)
+    if task is None:
+        task = asyncio.ensure_future(_validate_remote_locked(token))
+        _INFLIGHT[token] = task
+        task.add_done_callback(lambda _: _INFLIGHT.pop(token, None))
+    return task
+
+
+async def _validate_coalesced(token: str) -> CurrentUser:
+    """Share one in-flight validation between all concurrent requests for a token."""
+    # shield: a cancelled (disconnected) request must not cancel the shared call
+    return await asyncio.shield(_inflight(token))
+
 
+def _refresh_done(task: "asyncio.Task[CurrentUser]"):
+    if task.cancelled():
+        return
+    exc = task.exception()
+    if exc is not None and not (isinstance(exc, HTTPException) and exc.status_code == 401):
+        logger.warning(f"Background token refresh failed: {exc!r}")
+
+
+def _refresh_in_background(token: str):
+    """Revalidate a stale token without blocking the request that is served from it."""
+    task = _inflight(token)
+    task.add_done_callback(_refresh_done)
+
+
+async def authenticate(token: str) -> Tuple[CurrentUser, str]:
+    """
+    Validate token through the cache tiers, local verification and the parent API.
+    Returns (user, cache) where cache is "hit", "stale" or "miss".
+    """
+    hit, user = await _cache_get(token)
+    if hit:
+        if user is None:
+            raise _invalid_token()
+        return user, "hit"
+
+    if settings.AUTH_MODE == "local":
+        claims = await decode_token(token)
+        if claims:
+            user = _user_from_payload(claims)
+            await _cache_set(token, user, _positive_ttl(token, claims.get("exp")))
+            return user, "miss"
+
+    stale, revalidate = _stale_get(token)
+    if stale is not None and revalidate:
+        _refresh_in_background(token)
+        return stale, "stale"
+
+    try:
+        return await _validate_coalesced(token), "miss"
+    except HTTPException as exc:
+        # Parent auth slow or down: keep recently valid users signed in
+        if stale is not None and exc.status_code >= 500:
+            logger.warning(f"Auth service unavailable ({exc.detail}), serving stale user {stale.user_id}")
+            return stale, "stale"
+        raise
+
+
+async def get_user_profile(token: str) -> Tuple[Dict[str, Any], str, int]:
+    """
+    Parent /auth/me payload for token, served from the validation cache.
+    Returns (profile, cache, ttl) — ttl is the seconds the cached result stays fresh.
+    """
+    user, cache = await authenticate(token)
+    if user.profile is None:
+        # Verified locally (AUTH_MODE=local): fetch the parent profile once, then cached
+        user, cache = await _validate_coalesced(token), "miss"
+        if user.profile is None:
+            raise HTTPException(
+                status_code=status.HTTP_502_BAD_GATEWAY,
+                detail="Auth service returned no profile",
+            )
+
+    entry = _TOKEN_CACHE.get(token)
+    ttl = max(0, int(entry[1] - time.time())) if entry else 0
+    return user.profile, cache, ttl
+
+
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+) -> CurrentUser:
+    """
+    Validate JWT token locally (AUTH_MODE=local) or by calling the parent
+    project's /api/v1/auth/me. Results are cached for up to 5 minutes
+    (never beyond the token's expiry), shared across workers via Redis.
+    """
+    user, _ = await authenticate(credentials.credentials)
+    return user
@@ -0,0 +1,205 @@
+"""
+Minimal async Docker Engine API client over the Unix socket (httpx UDS transport).
+
+Replaces spawning `docker` / `curl` processes for container logs and signals.
+Log streams of non-TTY containers are multiplexed: every frame starts with an
+8-byte header — stream type (1 = stdout, 2 = stderr), three zero bytes and the
+big-endian uint32 payload size — which FrameDecoder parses, so frames that are
+split across reads or contain several lines are handled correctly.
+
+A client is opened per call: connecting to a local socket costs microseconds,
+and callers run in different event loops (requests, asyncio.run in tasks).
+"""
+
+import os
+import re
+import struct
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import httpx
+from fastapi import HTTPException
+
+from app.core import settings
+
+STDOUT = 1
+STDERR = 2
+
+_HEADER = struct.Struct(">BxxxL")
+_DURATION = re.compile(r"^(?:(\d+)h)?(?:(\d+)m)?(?:(\d+)s)?$")
+
+# Container name -> (Config.Tty, expiry). TTY containers stream raw, unframed
+# output. Entries expire because a name can be reused by a recreated container
+_TTY: Dict[str, Tuple[bool, float]] = {}
+_TTY_TTL = 60  # seconds
+
+
+class FrameDecoder:
+    """
+    Incremental demultiplexer for Docker log streams.
+    feed() takes raw bytes and returns complete (stream, line) pairs; partial
+    frames and partial lines are kept until the next call.
+    """
+
+    def __init__(self, tty: bool = False):
+        self.tty = tty
+        self._buffer = b""
+        self._lines: Dict[int, bytes] = {STDOUT: b"", STDERR: b""}
+
+    def feed(self, data: bytes) -> List[Tuple[int, str]]:
+        if self.tty:
+            return self._split(STDOUT, data)
+
+        self._buffer += data
+        out: List[Tuple[int, str]] = []
+        while len(self._buffer) >= _HEADER.size:
+            stream, size = _HEADER.unpack_from(self._buffer)
+            end = _HEADER.size + size
+            if len(self._buffer) < end:
+                break
+            payload = self._buffer[_HEADER.size:end]
+            self._buffer = self._buffer[end:]
+            out.extend(self._split(stream if stream in self._lines else STDOUT, payload))
+        return out
+
+    def flush(self) -> List[Tuple[int, str]]:
+        """Return the unterminated last line of each stream."""
+        out = [(stream, self._decode(rest)) for stream, rest in self._lines.items() if rest]
+        self._lines = {STDOUT: b"", STDERR: b""}
+        return out
+
+    def _split(self, stream: int, data: bytes) -> List[Tuple[int, str]]:
+        parts = (self._lines[stream] + data).split(b"\n")
+        self._lines[stream] = parts.pop()
+        return [(stream, self._decode(p)) for p in parts]
+
+    @staticmethod
+    def _decode(line: bytes) -> str:
+        return line.decode("utf-8", errors="replace").rstrip("\r")
+
+
+def parse_since(since: Optional[str]) -> Optional[int]:
+    """
+    Convert `docker logs --since` style values: a duration ('1h', '30m',
+    '2h30m'), a unix timestamp or an RFC 3339 timestamp ('2024-01-01T00:00:00Z',
+    UTC if no offset is given).
+    """
+    if not since:
+        return None
+    if since.isdigit():
+        return int(since)
+    match = _DURATION.match(since)
+    if not match or not any(match.groups()):
+        try:
+            moment = datetime.fromisoformat(since)
+        except ValueError:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid 'since' value '{since}', use e.g. '1h', '30m', '2h30m' or '2024-01-01T00:00:00Z'",
+            )
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=timezone.utc)
+        return int(moment.timestamp())
+    hours, minutes, seconds = (int(g or 0) for g in match.groups())
+    return int(time.time()) - (hours * 3600 + minutes * 60 + seconds)
+
+
+@asynccontextmanager
+async def _client(timeout: Optional[float] = 15.0) -> AsyncIterator[httpx.AsyncClient]:
+    if not os.path.exists(settings.DOCKER_SOCKET):
+        raise HTTPException(
+            status_code=500,
+            detail="docker.sock not available. Mount /var/run/docker.sock to enable log access.",
+        )
+    transport = httpx.AsyncHTTPTransport(uds=settings.DOCKER_SOCKET)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://docker", timeout=httpx.Timeout(timeout, connect=5.0),
+    ) as client:
+        yield client
+
+
+def _raise_for_status(response: httpx.Response, container_name: str):
+    if response.status_code == 404:
+        raise HTTPException(status_code=404, detail=f"Container '{container_name}' not found")
+    if response.status_code >= 400:
+        raise HTTPException(
+            status_code=502,
+            detail=f"Docker API returned {response.status_code} for '{container_name}'",
+        )
+
+
+async def _is_tty(client: httpx.AsyncClient, container_name: str) -> bool:
+    cached = _TTY.get(container_name)
+    if cached is not None and cached[1] > time.monotonic():
+        return cached[0]
+    response = await client.get(f"/containers/{container_name}/json")
+    _raise_for_status(response, container_name)
+    tty = bool(response.json().get("Config", {}).get("Tty"))
+    _TTY[container_name] = (tty, time.monotonic() + _TTY_TTL)
+    return tty
+
+
+def _logs_params(tail: int, since: Optional[str], timestamps: bool, follow: bool) -> dict:
+    params = {"stdout": 1, "stderr": 1, "tail": tail, "timestamps": int(timestamps), "follow": int(follow)}
+    since_ts = parse_since(since)
+    if since_ts is not None:
+        params["since"] = since_ts
+    return params
+
+
+async def container_logs(
+    container_name: str,
+    tail: int = 100,
+    since: Optional[str] = None,
+    timestamps: bool = False,
+) -> List[str]:
+    """Last `tail` log lines of a container (stdout and stderr, in stream order)."""
+    try:
+        async with _client() as client:
+            decoder = FrameDecoder(tty=await _is_tty(client, container_name))
+            response = await client.get(
+                f"/containers/{container_name}/logs",
+                params=_logs_params(tail, since, timestamps, follow=False),
+            )
+            _raise_for_status(response, container_name)
+    except httpx.TimeoutException:
+        raise HTTPException(status_code=504, detail="Timeout reading container logs")
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=500, detail=f"Docker API request failed: {e}")
+
+    frames = decoder.feed(response.content) + decoder.flush()
+    return [line for _, line in frames]
+
+
+async def follow_logs(
+    container_name: str,
+    tail: int = 0,
+    since: Optional[str] = None,
+    timestamps: bool = False,
+) -> AsyncIterator[str]:
+    """Yield container log lines as they are written (follow=1), until the container stops."""
+    async with _client(timeout=None) as client:
+        decoder = FrameDecoder(tty=await _is_tty(client, container_name))
+        async with client.stream(
+            "GET",
+            f"/containers/{container_name}/logs",
+            params=_logs_params(tail, since, timestamps, follow=True),
+        ) as response:
+            _raise_for_status(response, container_name)
+            async for chunk in response.aiter_raw():
+                for _, line in decoder.feed(chunk):
+                    yield line
+        for _, line in decoder.flush():
+            yield line
+
+
+async def kill_container(container_name: str, signal: str = "HUP"):
+    """Send a signal to a container (POST /containers/{name}/kill)."""
+    try:
+        async with _client(timeout=10.0) as client:
+            response = await client.post(f"/containers/{container_name}/kill", params={"signal": signal})
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=500, detail=f"Docker API request failed: {e}")
+    _raise_for_status(response, container_name)
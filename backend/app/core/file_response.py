@@ -0,0 +1,159 @@
+"""
+HTTP responses for files on local disk (uploads, image variants), with
+validators, conditional requests and byte ranges:
+
+- ETag and Last-Modified on every response; If-None-Match / If-Modified-Since
+  answered with 304 without opening the file.
+- Range (single byte range, as used by video players) answered with 206,
+  honouring If-Range; unsatisfiable ranges get 416.
+- With UPLOAD_ACCEL_REDIRECT_PREFIX set, the body is not sent from Python at
+  all: the response carries X-Accel-Redirect and nginx serves the file from
+  its internal location, including ranges. The API only does the
+  authorization and lookup. Only nginx servers that define that location
+  (nginx/conf.d/default.conf and the custom-domain servers generated in
+  routers/sites.py) send `X-Accel-Uploads: on`; requests without it, e.g.
+  via custom-domain configs generated before, are streamed from Python.
+
+The ETag has nginx's format ("<mtime hex>-<size hex>"), so validators stay
+the same whichever of the two serves the file. Files are never gzipped
+(GZipExceptFilesMiddleware): ranges and ETags refer to the stored bytes, and
+media does not compress anyway.
+"""
+
+import asyncio
+import mimetypes
+import os
+import stat
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Optional, Tuple
+from urllib.parse import quote
+
+import aiofiles
+from fastapi import HTTPException, Request, Response
+from fastapi.responses import FileResponse, StreamingResponse
+from starlette.middleware.gzip import GZipMiddleware
+
+from app.core import settings
+
+CHUNK_SIZE = 256 * 1024
+# Routes answered by file_response()
+FILE_PATH_PREFIXES = ("/api/v1/uploads/",)
+
+
+def _etag(st: os.stat_result) -> str:
+    return f'"{int(st.st_mtime):x}-{st.st_size:x}"'
+
+
+def _not_modified(request: Request, etag: str, mtime: int) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # Weak comparison (RFC 9110 13.1.2)
+        tags = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return mtime <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def _byte_range(request: Request, size: int, etag: str, last_modified: str) -> Optional[Tuple[int, int]]:
+    """
+    (start, end) inclusive for a satisfiable single-range request, None to
+    send the whole file. Raises 416 for unsatisfiable ranges.
+    """
+    header = request.headers.get("range")
+    if not header or not header.startswith("bytes="):
+        return None
+    if_range = request.headers.get("if-range")
+    if if_range is not None and if_range not in (etag, last_modified):
+        return None  # the client's partial copy is outdated: send everything
+    spec = header[len("bytes="):].strip()
+    if "," in spec:
+        return None  # multipart ranges are not supported; a full response is valid
+
+    first, _, last = spec.partition("-")
+    try:
+        if first:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+        else:
+            start, end = max(size - int(last), 0), size - 1  # suffix: last N bytes
+    except ValueError:
+        return None
+    if start > end or start >= size:
+        raise HTTPException(
+            status_code=416, detail="Range not satisfiable", headers={"Content-Range": f"bytes */{size}"},
+        )
+    return start, end
+
+
+async def _read_range(path: str, start: int, end: int):
+    async with aiofiles.open(path, "rb") as f:
+        await f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = await f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+async def file_response(
+    request: Request,
+    path: str,
+    cache_control: str,
+    media_type: Optional[str] = None,
+) -> Response:
+    """Serve a regular file under UPLOAD_DIR; 404 if it does not exist."""
+    try:
+        st = await asyncio.to_thread(os.stat, path)
+    except (FileNotFoundError, NotADirectoryError):
+        raise HTTPException(status_code=404, detail="File not found")
+    if not stat.S_ISREG(st.st_mode):
+        raise HTTPException(status_code=404, detail="File not found")
+
+    etag = _etag(st)
+    last_modified = formatdate(st.st_mtime, usegmt=True)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": last_modified,
+        "Cache-Control": cache_control,
+        "Accept-Ranges": "bytes",
+    }
+    if _not_modified(request, etag, int(st.st_mtime)):
+        return Response(status_code=304, headers=headers)
+
+    media_type = media_type or mimetypes.guess_type(path)[0] or "application/octet-stream"
+    if settings.UPLOAD_ACCEL_REDIRECT_PREFIX and request.headers.get("x-accel-uploads") == "on":
+        relative = os.path.relpath(path, settings.UPLOAD_DIR)
+        headers["X-Accel-Redirect"] = settings.UPLOAD_ACCEL_REDIRECT_PREFIX.rstrip("/") + "/" + quote(relative)
+        # nginx takes Content-Type from here and does ranges/conditionals itself
+        return Response(media_type=media_type, headers=headers)
+
+    byte_range = _byte_range(request, st.st_size, etag, last_modified)
+    if byte_range is None:
+        return FileResponse(path, media_type=media_type, headers=headers, stat_result=st)
+
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{st.st_size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(
+        _read_range(path, start, end),
+        status_code=206,
+        media_type=media_type,
+        headers=headers,
+    )
+
+
+class GZipExceptFilesMiddleware(GZipMiddleware):
+    """GZipMiddleware that leaves file downloads (FILE_PATH_PREFIXES) alone."""
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].startswith(FILE_PATH_PREFIXES):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
@@ -0,0 +1,69 @@
+"""
+Application-scoped outbound HTTP clients (httpx) with connection pooling.
+
+One pooled client per upstream, so pool limits are effectively per host and
+keep-alive connections are reused across requests instead of paying a new
+TCP + TLS handshake on every auth cache miss. Opened in the FastAPI lifespan
+and closed on shutdown; created lazily if used outside the app (tasks, CLI).
+"""
+
+import logging
+from typing import Dict
+
+import httpx
+
+from app.core import settings
+
+logger = logging.getLogger(__name__)
+
+# Upstream names
+PARENT = "parent"      # EXTERNAL_AUTH_URL: /auth/me, agent context, JWKS
+EXTERNAL = "external"  # everything else (public IP detection, ...)
+
+
+class HttpClients:
+    """Registry of pooled httpx.AsyncClient instances, one per upstream."""
+    clients: Dict[str, httpx.AsyncClient] = {}
+
+    @classmethod
+    def _create(cls) -> httpx.AsyncClient:
+        http2 = settings.HTTP_HTTP2
+        if http2:
+            try:
+                import h2  # noqa: F401 — httpx needs it for HTTP/2
+            except ImportError:
+                logger.warning("HTTP_HTTP2 is enabled but 'h2' is not installed; using HTTP/1.1")
+                http2 = False
+        return httpx.AsyncClient(
+            http2=http2,
+            timeout=httpx.Timeout(settings.HTTP_TIMEOUT, connect=settings.HTTP_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=settings.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+            ),
+        )
+
+    @classmethod
+    def connect(cls):
+        for name in (PARENT, EXTERNAL):
+            if name not in cls.clients:
+                cls.clients[name] = cls._create()
+
+    @classmethod
+    async def close(cls):
+        clients, cls.clients = cls.clients, {}
+        for client in clients.values():
+            await client.aclose()
+
+    @classmethod
+    def get(cls, name: str = EXTERNAL) -> httpx.AsyncClient:
+        client = cls.clients.get(name)
+        if client is None or client.is_closed:
+            client = cls.clients[name] = cls._create()
+        return client
+
+
+def get_http_client(name: str = EXTERNAL) -> httpx.AsyncClient:
+    """Return the pooled client for an upstream (PARENT or EXTERNAL)."""
+    return HttpClients.get(name)
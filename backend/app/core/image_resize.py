@@ -0,0 +1,220 @@
+"""
+On-demand resizing of uploaded images (GET /uploads/{user_id}/{filename}?w=&h=&fmt=).
+
+A requested size is rendered once, in a worker thread, and cached on disk:
+
+    UPLOAD_DIR/.cache/resized/ab/<key>.<fmt>
+
+The key hashes the source identity and the parameters. For content-addressed
+uploads the identity is the content hash, so users sharing an image share its
+resized copies. The cache is an LRU bounded by IMAGE_RESIZE_CACHE_BYTES:
+hits refresh the file's atime (set explicitly, so mount options do not
+matter), and when the budget is exceeded the least recently used files are
+deleted down to 90% of it. The mtime is left alone: it is what the ETag and
+Last-Modified of the served copy are built from (app/core/file_response.py).
+
+Requested dimensions are rounded up to the allowed sizes (IMAGE_RESIZE_SIZES,
+IMAGE_VARIANT_WIDTHS and IMAGE_RESIZE_MAX_DIMENSION) before anything else, so
+the number of variants per image is small and fixed: arbitrary w/h values on
+the public URL cannot fill the cache with near-duplicates and evict useful
+entries.
+
+Concurrent requests for the same variant share one render (per process;
+across workers the atomic rename makes a duplicate render harmless), and
+renders are limited to IMAGE_RESIZE_CONCURRENCY at a time.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from PIL import Image, ImageOps
+
+from app.core import image_variants, settings
+from app.core.image_variants import IMAGE_EXTS
+
+try:
+    import pillow_avif  # noqa: F401 — registers the AVIF plugin on Pillow < 11.2
+except ImportError:
+    pass
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR_NAME = os.path.join(".cache", "resized")
+
+# fmt query value -> (Pillow format, media type)
+FORMATS: Dict[str, Tuple[str, str]] = {
+    "webp": ("WEBP", "image/webp"),
+    "avif": ("AVIF", "image/avif"),
+    "jpeg": ("JPEG", "image/jpeg"),
+    "png": ("PNG", "image/png"),
+}
+# Animated GIFs are resized to their first frame — fine for thumbnails
+RESIZABLE_EXTS = IMAGE_EXTS | {".gif"}
+
+_EVICT_TO = 0.9  # fraction of the budget left after an eviction pass
+
+_INFLIGHT: Dict[str, "asyncio.Task[str]"] = {}
+_slots: Optional[asyncio.Semaphore] = None
+_cache_bytes: Optional[int] = None  # estimate, re-measured on every eviction pass
+_cache_lock = threading.Lock()
+
+
+def can_encode(fmt: str) -> bool:
+    Image.init()
+    return fmt in FORMATS and FORMATS[fmt][0] in Image.SAVE
+
+
+def sizes() -> List[int]:
+    """Allowed output dimensions, ascending."""
+    configured = {int(s) for s in settings.IMAGE_RESIZE_SIZES.split(",") if s.strip()}
+    configured.update(image_variants.widths())
+    limit = settings.IMAGE_RESIZE_MAX_DIMENSION
+    return sorted({s for s in configured if 0 < s < limit} | {limit})
+
+
+def snap(value: Optional[int]) -> Optional[int]:
+    """Smallest allowed size >= value (the largest one above them all)."""
+    if not value:
+        return None
+    allowed = sizes()
+    return next((s for s in allowed if s >= value), allowed[-1])
+
+
+def _cache_dir() -> str:
+    return os.path.join(settings.UPLOAD_DIR, CACHE_DIR_NAME)
+
+
+def cache_path(source_id: str, w: Optional[int], h: Optional[int], fmt: str) -> str:
+    key = hashlib.sha256(f"{source_id}:{w or 0}x{h or 0}:{fmt}".encode()).hexdigest()
+    return os.path.join(_cache_dir(), key[:2], f"{key}.{fmt}")
+
+
+def _hit(path: str) -> bool:
+    """True if path is cached; marks it as recently used (atime, keeping mtime)."""
+    try:
+        st = os.stat(path)
+        os.utime(path, ns=(time.time_ns(), st.st_mtime_ns))
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def _render(source: str, dest: str, w: Optional[int], h: Optional[int], fmt: str) -> int:
+    """Resize source to fit w x h (never upscaling) and write it to dest. Returns the file size."""
+    pil_format = FORMATS[fmt][0]
+    with Image.open(source) as src:
+        if src.format == "JPEG" and (w or h):
+            # Let the JPEG decoder downscale by 1/2..1/8 (square box: safe under EXIF rotation)
+            target = max(w or 0, h or 0)
+            src.draft("RGB", (target, target))
+        img = ImageOps.exif_transpose(src)
+        img.load()
+
+    if pil_format == "JPEG":
+        img = img.convert("RGB")
+    elif img.mode not in ("RGB", "RGBA"):
+        img = img.convert("RGBA")
+    img.thumbnail((w or img.width, h or img.height), Image.LANCZOS, reducing_gap=3.0)
+
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    tmp = f"{dest}.{threading.get_ident()}.tmp"
+    try:
+        if pil_format == "PNG":
+            img.save(tmp, pil_format, optimize=True)
+        else:
+            img.save(tmp, pil_format, quality=settings.IMAGE_VARIANT_QUALITY)
+        os.replace(tmp, dest)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except FileNotFoundError:
+            pass
+        raise
+    return os.path.getsize(dest)
+
+
+def _evict() -> int:
+    """Delete least recently used files until the cache is within budget. Returns the new total."""
+    files = []
+    total = 0
+    for root, _, names in os.walk(_cache_dir()):
+        for name in names:
+            if name.endswith(".tmp"):
+                continue  # render in progress
+            path = os.path.join(root, name)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            files.append((st.st_atime, st.st_size, path))
+            total += st.st_size
+
+    if total > settings.IMAGE_RESIZE_CACHE_BYTES:
+        limit = settings.IMAGE_RESIZE_CACHE_BYTES * _EVICT_TO
+        removed = 0
+        for _, size, path in sorted(files):
+            if total <= limit:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        logger.info(f"IMAGES: evicted {removed} resized images, cache now {total} bytes")
+    return total
+
+
+def _account(added: int):
+    global _cache_bytes
+    with _cache_lock:
+        if _cache_bytes is None:
+            _cache_bytes = _evict()  # first write in this process: measure
+            return
+        _cache_bytes += added
+        if _cache_bytes > settings.IMAGE_RESIZE_CACHE_BYTES:
+            _cache_bytes = _evict()
+
+
+async def _generate(source: str, dest: str, w: Optional[int], h: Optional[int], fmt: str) -> str:
+    global _slots
+    if _slots is None:
+        _slots = asyncio.Semaphore(settings.IMAGE_RESIZE_CONCURRENCY)
+    async with _slots:
+        if await asyncio.to_thread(_hit, dest):
+            return dest  # rendered by another worker meanwhile
+        try:
+            size = await asyncio.to_thread(_render, source, dest, w, h, fmt)
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="File not found")
+        except (OSError, ValueError, Image.DecompressionBombError) as e:
+            logger.warning(f"IMAGES: cannot resize {source}: {e}")
+            raise HTTPException(status_code=415, detail="File is not a resizable image")
+    await asyncio.to_thread(_account, size)
+    return dest
+
+
+async def resized(source: str, source_id: str, w: Optional[int], h: Optional[int], fmt: str) -> str:
+    """
+    Path of the cached resized copy of source, rendering it first if needed.
+    source_id identifies the source bytes (content hash, or path + mtime);
+    w and h are snapped to the allowed sizes.
+    """
+    w, h = snap(w), snap(h)
+    dest = cache_path(source_id, w, h, fmt)
+    if await asyncio.to_thread(_hit, dest):
+        return dest
+
+    task = _INFLIGHT.get(dest)
+    if task is None:
+        task = asyncio.ensure_future(_generate(source, dest, w, h, fmt))
+        _INFLIGHT[dest] = task
+        task.add_done_callback(lambda _: _INFLIGHT.pop(dest, None))
+    # shield: a disconnected client must not cancel a render others wait for
+    return await asyncio.shield(task)
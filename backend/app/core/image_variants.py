@@ -0,0 +1,105 @@
+"""
+Resized WebP/AVIF variants of uploaded images (generated by app/tasks/images.py).
+
+Variants belong to the content, not to a user, so they live next to the
+content-addressed store (app/core/upload_store.py):
+
+    UPLOAD_DIR/variants/ab/cd/<sha256>/w640.webp
+    UPLOAD_DIR/variants/ab/cd/<sha256>/w640.avif
+    UPLOAD_DIR/variants/ab/cd/<sha256>/manifest.json
+
+The manifest is written last, so its presence means the set is complete:
+    {"width": 2400, "height": 1600, "color": "#8a7f6e",
+     "variants": [{"name": "w640.webp", "format": "webp", "width": 640, "height": 427, "size": 31337}, ...]}
+
+Variants are served by GET /api/v1/uploads/variants/{sha256}/{name} and are
+deleted together with the last reference to the original.
+
+Functions here do blocking filesystem calls — run them via asyncio.to_thread
+from async code.
+"""
+
+import json
+import os
+import re
+import shutil
+from typing import Any, Dict, List, Optional
+
+from app.core import settings
+from app.core.upload_store import parse_content_name
+
+VARIANTS_DIR_NAME = "variants"
+MANIFEST_NAME = "manifest.json"
+
+# Raster formats Pillow decodes; GIFs are left alone (animation), SVGs need no variants
+IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".webp", ".bmp", ".tif", ".tiff"}
+
+_VARIANT_NAME = re.compile(r"^w\d{1,5}\.(webp|avif)$")
+# /api/v1/uploads/{user_id}/{sha256}{ext}, optionally absolute
+_UPLOAD_URL = re.compile(r"/api/v1/uploads/[^/]+/([^/?#]+)(?:[?#].*)?$")
+
+
+def widths() -> List[int]:
+    """Configured variant widths, ascending."""
+    return sorted({int(w) for w in settings.IMAGE_VARIANT_WIDTHS.split(",") if w.strip()})
+
+
+def is_image(ext: str) -> bool:
+    return ext in IMAGE_EXTS
+
+
+def variants_dir(sha256: str) -> str:
+    return os.path.join(settings.UPLOAD_DIR, VARIANTS_DIR_NAME, sha256[:2], sha256[2:4], sha256)
+
+
+def variant_name(width: int, fmt: str) -> str:
+    return f"w{width}.{fmt}"
+
+
+def variant_path(sha256: str, name: str) -> Optional[str]:
+    """Path of a variant file, None if the name is not a variant name."""
+    if not _VARIANT_NAME.match(name):
+        return None
+    return os.path.join(variants_dir(sha256), name)
+
+
+def variant_url(sha256: str, name: str) -> str:
+    return f"/api/v1/uploads/variants/{sha256}/{name}"
+
+
+def load_manifest(sha256: str) -> Optional[Dict[str, Any]]:
+    """Manifest of the variants of a content, None if none were generated (yet)."""
+    try:
+        with open(os.path.join(variants_dir(sha256), MANIFEST_NAME)) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def write_manifest(sha256: str, manifest: Dict[str, Any]):
+    path = os.path.join(variants_dir(sha256), MANIFEST_NAME)
+    with open(path + ".tmp", "w") as f:
+        json.dump(manifest, f)
+    os.replace(path + ".tmp", path)
+
+
+def manifest_for_url(url: str) -> Optional[Dict[str, Any]]:
+    """
+    Manifest for an upload URL as stored in block content, with `sha256` added.
+    None for external URLs, legacy (non content-addressed) uploads and
+    images without variants.
+    """
+    match = _UPLOAD_URL.search(url or "")
+    if not match:
+        return None
+    sha256 = parse_content_name(match.group(1))
+    if sha256 is None:
+        return None
+    manifest = load_manifest(sha256)
+    if manifest is not None:
+        manifest["sha256"] = sha256
+    return manifest
+
+
+def remove(sha256: str):
+    shutil.rmtree(variants_dir(sha256), ignore_errors=True)
@@ -5,9 +5,8 @@ Used for DNS verification and domain settings UI.
 
 import time
 import logging
-import httpx
-
 from app.core import settings
+from app.core.http import get_http_client
 
 logger = logging.getLogger(__name__)
 
@@ -44,10 +43,9 @@ async def _detect_public_ip() -> str:
     ]
     for url in services:
         try:
-            async with httpx.AsyncClient(timeout=5) as client:
-                resp = await client.get(url)
-                if resp.status_code == 200:
-                    return resp.text.strip()
+            resp = await get_http_client().get(url, timeout=5)
+            if resp.status_code == 200:
+                return resp.text.strip()
         except Exception:
             continue
     return ""
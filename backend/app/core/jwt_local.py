@@ -0,0 +1,161 @@
+"""
+Local JWT verification for tokens issued by the parent project.
+
+Used when AUTH_MODE=local: signature and expiry are checked here, so a token
+does not need a round trip to EXTERNAL_AUTH_URL. Keys come from either
+- shared secrets: JWT_SECRET_KEY plus JWT_PREVIOUS_SECRET_KEYS (rotation), or
+- a JWKS endpoint (JWT_JWKS_URL), cached by `kid` and refetched on unknown kid.
+
+decode_token() returns None whenever the token cannot be decided locally
+(unknown key, bad signature, missing user id); the caller then falls back to
+the parent /auth/me. Expired, non-expiring (no `exp`) or otherwise invalid
+claims are rejected with 401.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+from fastapi import HTTPException, status
+from jose import jwt
+from jose.exceptions import ExpiredSignatureError, JWTClaimsError, JWTError
+
+from app.core import settings
+from app.core.http import get_http_client, PARENT
+
+logger = logging.getLogger(__name__)
+
+# Never accept tokens signed with the placeholder secret from .env.example
+_PLACEHOLDER_SECRETS = {"", "change-me-in-production", "change-me-to-match-parent-project"}
+
+# JWKS cache: kid -> JWK dict
+_JWKS: Dict[str, Dict[str, Any]] = {}
+_jwks_fetched_at: float = 0
+_jwks_lock = asyncio.Lock()
+_JWKS_TTL = 3600  # seconds
+_JWKS_MIN_REFRESH = 60  # seconds between refetches triggered by unknown kids
+
+# Asymmetric algorithms allowed per JWK key type. HMAC is never accepted via
+# JWKS: the token header must not be able to pick the algorithm (alg confusion)
+_JWK_ALGORITHMS = {
+    "RSA": ["RS256", "RS384", "RS512", "PS256", "PS384", "PS512"],
+    "EC": ["ES256", "ES384", "ES512"],
+}
+
+
+def _secret_keys() -> List[str]:
+    keys = [settings.JWT_SECRET_KEY] + [
+        k.strip() for k in settings.JWT_PREVIOUS_SECRET_KEYS.split(",")
+    ]
+    return [k for k in keys if k not in _PLACEHOLDER_SECRETS]
+
+
+async def _fetch_jwks():
+    global _JWKS, _jwks_fetched_at
+    resp = await get_http_client(PARENT).get(settings.JWT_JWKS_URL, timeout=5.0)
+    resp.raise_for_status()
+    _JWKS = {k["kid"]: k for k in resp.json().get("keys", []) if k.get("kid")}
+    _jwks_fetched_at = time.time()
+
+
+async def _jwks_key(kid: str) -> Optional[Dict[str, Any]]:
+    """Return the JWK for kid, refetching the JWKS if it is stale or kid is unknown."""
+    now = time.time()
+    key = _JWKS.get(kid)
+    if key and now - _jwks_fetched_at < _JWKS_TTL:
+        return key
+
+    async with _jwks_lock:
+        key = _JWKS.get(kid)
+        fresh = time.time() - _jwks_fetched_at
+        if key and fresh < _JWKS_TTL:
+            return key
+        if fresh < _JWKS_MIN_REFRESH:
+            return key  # refetched very recently by another request
+        try:
+            await _fetch_jwks()
+        except (httpx.HTTPError, ValueError) as exc:
+            logger.warning(f"JWKS fetch failed: {exc}")
+            return key  # keep serving the previous key set
+    return _JWKS.get(kid)
+
+
+def _jwk_algorithms(jwk_key: Dict[str, Any]) -> List[str]:
+    """Algorithms a JWK may verify: its key type's, narrowed to its own `alg` if set."""
+    allowed = _JWK_ALGORITHMS.get(jwk_key.get("kty"), [])
+    alg = jwk_key.get("alg")
+    if alg:
+        return [alg] if alg in allowed else []
+    return allowed
+
+
+def _decode(token: str, key: Any, algorithms: List[str]) -> Dict[str, Any]:
+    # Tokens without `exp` would never expire (and be cached as valid)
+    options = {"verify_aud": bool(settings.JWT_AUDIENCE), "verify_exp": True, "require_exp": True}
+    return jwt.decode(
+        token,
+        key,
+        algorithms=algorithms,
+        audience=settings.JWT_AUDIENCE or None,
+        issuer=settings.JWT_ISSUER or None,
+        options=options,
+    )
+
+
+async def decode_token(token: str) -> Optional[Dict[str, Any]]:
+    """
+    Verify token signature and claims locally.
+    Returns claims, None if the token cannot be verified here, or raises 401.
+    """
+    try:
+        header = jwt.get_unverified_header(token)
+    except JWTError:
+        return None
+
+    candidates: List[tuple] = []
+    kid = header.get("kid")
+    if kid and settings.JWT_JWKS_URL:
+        jwk_key = await _jwks_key(kid)
+        algorithms = _jwk_algorithms(jwk_key) if jwk_key else []
+        if algorithms:
+            candidates.append((jwk_key, algorithms))
+    elif header.get("alg", "").startswith("HS"):
+        # Only HMAC algorithms are allowed with shared secrets
+        algorithms = [settings.JWT_ALGORITHM] if settings.JWT_ALGORITHM.startswith("HS") else []
+        candidates.extend((secret, algorithms) for secret in _secret_keys() if algorithms)
+
+    if not candidates:
+        return None
+    try:
+        unverified = jwt.get_unverified_claims(token)
+    except JWTError:
+        return None
+    if "exp" not in unverified:
+        # require_exp fails as a plain JWTError, indistinguishable from a wrong key
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid token claims: missing exp",
+        )
+
+    for key, algorithms in candidates:
+        try:
+            claims = _decode(token, key, algorithms)
+        except ExpiredSignatureError:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid or expired token",
+            )
+        except JWTClaimsError as exc:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail=f"Invalid token claims: {exc}",
+            )
+        except JWTError:
+            continue  # wrong key (e.g. rotated secret) — try the next one
+        if not (claims.get("sub") or claims.get("id") or claims.get("user_id")):
+            return None
+        return claims
+
+    return None
@@ -0,0 +1,262 @@
+"""
+Readers for the rotating application log file (/tmp/app.log, see main.py).
+
+Reads are bounded by the number of lines requested, not by the file size:
+files are read backwards from the end in fixed-size blocks, continuing into
+the rotated backups (app.log.1 .. app.log.N, newest first) only when more
+history is needed. LogFollower follows the live file by polling (no inotify),
+surviving rotation and truncation.
+
+Log lines are JSON objects with a leading UTC `ts` field (see
+app/core/structured_log.py), so each file is sorted by time: query_range()
+binary-searches byte offsets for the start of a time window instead of
+scanning the file.
+
+All functions here do blocking file I/O — call them via asyncio.to_thread
+from async code.
+"""
+
+import os
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple
+
+import orjson
+
+# Must match the RotatingFileHandler in main.py
+LOG_BACKUP_COUNT = 3
+
+_BLOCK_SIZE = 64 * 1024
+
+# JSON log lines start with {"ts":"2024-05-01T12:00:00.123Z"
+_TS_PREFIX = b'{"ts":"'
+_TS_LEN = 24
+
+
+def rotated_files(path: str, backups: int = LOG_BACKUP_COUNT) -> List[str]:
+    """The log file and its existing rotated backups, newest first."""
+    candidates = [path] + [f"{path}.{i}" for i in range(1, backups + 1)]
+    return [p for p in candidates if os.path.exists(p)]
+
+
+def reverse_lines(path: str, end: Optional[int] = None) -> Iterator[bytes]:
+    """
+    Yield the non-empty lines of a file from last to first, reading backwards
+    in blocks. With `end`, only the bytes before that offset are read.
+    """
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return  # rotated away between listing and opening
+    with f:
+        pos = f.seek(0, os.SEEK_END)
+        if end is not None:
+            pos = min(pos, end)
+        rest = b""
+        while pos > 0:
+            size = min(_BLOCK_SIZE, pos)
+            pos -= size
+            f.seek(pos)
+            lines = (f.read(size) + rest).split(b"\n")
+            rest = lines.pop(0)  # may continue in the previous block
+            for line in reversed(lines):
+                if line:
+                    yield line
+        if rest:
+            yield rest
+
+
+def tail_lines(
+    path: str,
+    tail: int,
+    match: Optional[Callable[[str], bool]] = None,
+    backups: int = LOG_BACKUP_COUNT,
+    end: Optional[int] = None,
+) -> List[str]:
+    """
+    Last `tail` lines (oldest first) of the log and its rotated backups,
+    optionally only lines for which match(line) is true. `end` limits the
+    live file to the bytes before that offset (see LogFollower.start).
+    """
+    found: List[str] = []
+    for file_path in rotated_files(path, backups):
+        for raw in reverse_lines(file_path, end if file_path == path else None):
+            line = raw.decode("utf-8", errors="replace").rstrip("\r")
+            if match is None or match(line):
+                found.append(line)
+                if len(found) >= tail:
+                    return found[::-1]
+    return found[::-1]
+
+
+class LogFollower:
+    """
+    Polling follower of a rotating log file (`tail -F` without inotify).
+    poll() returns the complete lines appended since the previous call. When
+    the path is rotated (now names another inode) the old file is drained
+    first and reading continues from the start of the new one; a truncated
+    file is re-read from the start.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file: Optional[BinaryIO] = None
+        self._inode: Optional[int] = None
+        self._partial = b""
+
+    def _open(self, from_end: bool) -> bool:
+        try:
+            self._file = open(self.path, "rb")
+        except FileNotFoundError:
+            return False
+        if from_end:
+            self._file.seek(0, os.SEEK_END)
+        self._inode = os.fstat(self._file.fileno()).st_ino
+        return True
+
+    def start(self) -> int:
+        """
+        Begin following at the current end of the file. Returns that offset
+        (0 if the file does not exist yet and will be read from its start),
+        so history can be read up to exactly where following starts.
+        """
+        if not self._open(from_end=True):
+            return 0
+        return self._file.tell()
+
+    def poll(self) -> List[str]:
+        if self._file is None and not self._open(from_end=False):
+            return []
+
+        data = self._file.read()
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            st = None  # between rotation and re-creation — keep the old file
+
+        if st is not None and st.st_ino != self._inode:
+            # Rotated: the old file is fully read, flush its last partial line
+            if (self._partial or data) and not data.endswith(b"\n"):
+                data += b"\n"
+            self._file.close()
+            self._file = None
+            lines = self._split(data)
+            if self._open(from_end=False):
+                lines += self._split(self._file.read())
+            return lines
+
+        if st is not None and st.st_size < self._file.tell():
+            self._file.seek(0)  # truncated in place
+            self._partial = b""
+            data = self._file.read()
+
+        return self._split(data)
+
+    def _split(self, data: bytes) -> List[str]:
+        if not data:
+            return []
+        parts = (self._partial + data).split(b"\n")
+        self._partial = parts.pop()
+        return [p.decode("utf-8", errors="replace").rstrip("\r") for p in parts if p]
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+# ── Time-range queries over JSON lines ────────────────────────────────────────
+
+def line_ts(line: bytes) -> Optional[str]:
+    """The `ts` of a JSON log line, or None for other lines (plain text, partial)."""
+    if line.startswith(_TS_PREFIX):
+        return line[len(_TS_PREFIX):len(_TS_PREFIX) + _TS_LEN].decode("ascii", errors="replace")
+    try:
+        ts = orjson.loads(line).get("ts")
+    except (orjson.JSONDecodeError, AttributeError):
+        return None
+    return ts if isinstance(ts, str) else None
+
+
+def _first_ts_from(f: BinaryIO, pos: int) -> Tuple[int, Optional[str]]:
+    """(offset, ts) of the first timestamped line starting at or after byte pos."""
+    f.seek(max(pos - 1, 0))
+    if pos > 0:
+        f.readline()  # finish the line containing pos - 1
+    while True:
+        offset = f.tell()
+        line = f.readline()
+        if not line:
+            return offset, None
+        ts = line_ts(line)
+        if ts is not None:
+            return offset, ts
+
+
+def find_offset(f: BinaryIO, size: int, ts: str) -> int:
+    """Byte offset of the first line with line ts >= ts (binary search, O(log size) seeks)."""
+    lo, hi = 0, size
+    while lo < hi:
+        mid = (lo + hi) // 2
+        _, mid_ts = _first_ts_from(f, mid)
+        if mid_ts is None or mid_ts >= ts:
+            hi = mid
+        else:
+            lo = mid + 1
+    return _first_ts_from(f, lo)[0]
+
+
+def iter_range(
+    path: str,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    backups: int = LOG_BACKUP_COUNT,
+    end_offset: Optional[int] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yield JSON log entries with start <= ts <= end (ISO strings as written by
+    format_ts), oldest first, across the rotated files. `end_offset` limits
+    the live file to the bytes before that offset (see LogFollower.start).
+    """
+    for file_path in reversed(rotated_files(path, backups)):  # oldest first
+        try:
+            f = open(file_path, "rb")
+        except FileNotFoundError:
+            continue
+        with f:
+            size = f.seek(0, os.SEEK_END)
+            offset = find_offset(f, size, start) if start else 0
+            f.seek(offset)
+            limit = end_offset if file_path == path else None
+            for line in f:
+                offset += len(line)
+                if limit is not None and offset > limit:
+                    return  # the rest of the live file belongs to the follower
+                ts = line_ts(line)
+                if ts is None:
+                    continue
+                if end and ts > end:
+                    return  # later files are newer still
+                try:
+                    yield orjson.loads(line)
+                except orjson.JSONDecodeError:
+                    continue
+
+
+def query_range(
+    path: str,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    match: Optional[Callable[[Dict[str, Any]], bool]] = None,
+    limit: int = 1000,
+    backups: int = LOG_BACKUP_COUNT,
+) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    Entries of iter_range() for which match(entry) is true, up to `limit`.
+    Returns (entries, truncated) — truncated is True when `limit` was reached.
+    """
+    entries: List[Dict[str, Any]] = []
+    for entry in iter_range(path, start, end, backups):
+        if match is None or match(entry):
+            entries.append(entry)
+            if len(entries) >= limit:
+                return entries, True
+    return entries, False
@@ -0,0 +1,186 @@
+"""
+In-memory rollups of the structured application log for GET /logs/app/stats.
+
+A background task (started in the FastAPI lifespan) backfills the retention
+window from the log files once, then follows the live file and folds every
+new JSON line into per-minute buckets: counts per level, per logger, and
+recurring ERROR/CRITICAL messages. Messages are grouped after replacing
+numbers, ids and hashes with placeholders, so "Site 3f2a… not found" counts
+as one recurring error. Queries only sum the buckets in the window.
+"""
+
+import asyncio
+import logging
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Dict, List, Optional
+
+import orjson
+
+from app.core import settings
+from app.core.log_reader import LogFollower, iter_range
+from app.core.structured_log import format_ts
+
+logger = logging.getLogger(__name__)
+
+_ERROR_LEVELS = {"ERROR", "CRITICAL"}
+_MAX_ERRORS_PER_BUCKET = 200
+_POLL_INTERVAL = 1.0  # seconds
+
+_VARIABLE = re.compile(
+    r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}"  # uuid
+    r"|\b[0-9a-f]{16,}\b"  # hashes, object ids
+    r"|0x[0-9a-f]+"
+    r"|\d+",
+    re.IGNORECASE,
+)
+
+
+def error_key(message: str) -> str:
+    """Group key for an error message: first line with variable parts replaced."""
+    first_line = message.split("\n", 1)[0][:300]
+    return _VARIABLE.sub("#", first_line)
+
+
+class _Bucket:
+    __slots__ = ("levels", "loggers", "errors")
+
+    def __init__(self):
+        self.levels: Counter = Counter()
+        self.loggers: Counter = Counter()
+        # error key -> [count, example message, logger, last ts]
+        self.errors: Dict[str, list] = {}
+
+
+class LogStats:
+    """Per-minute rollups of the application log, kept for LOG_STATS_RETENTION_MINUTES."""
+
+    def __init__(self):
+        self._buckets: "OrderedDict[str, _Bucket]" = OrderedDict()  # "YYYY-MM-DDTHH:MM" -> bucket
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.ready = False
+
+    def ingest(self, entry: Dict[str, Any]):
+        ts = entry.get("ts")
+        if not isinstance(ts, str):
+            return
+        minute = ts[:16]
+        level = entry.get("level", "")
+        with self._lock:
+            bucket = self._buckets.get(minute)
+            if bucket is None:
+                bucket = self._buckets[minute] = _Bucket()
+                self._evict()
+            bucket.levels[level] += 1
+            bucket.loggers[entry.get("logger", "")] += 1
+            if level in _ERROR_LEVELS:
+                message = str(entry.get("msg", ""))
+                key = error_key(message)
+                error = bucket.errors.get(key)
+                if error is not None:
+                    error[0] += 1
+                    error[3] = ts
+                elif len(bucket.errors) < _MAX_ERRORS_PER_BUCKET:
+                    bucket.errors[key] = [1, message[:1000], entry.get("logger", ""), ts]
+
+    def ingest_line(self, line: str):
+        if not line.startswith("{"):
+            return
+        try:
+            self.ingest(orjson.loads(line))
+        except orjson.JSONDecodeError:
+            pass
+
+    def _evict(self):
+        cutoff = format_ts(time.time() - settings.LOG_STATS_RETENTION_MINUTES * 60)[:16]
+        while self._buckets:
+            oldest = next(iter(self._buckets))
+            if oldest >= cutoff:
+                break
+            del self._buckets[oldest]
+
+    def snapshot(self, minutes: int, top: int = 10) -> Dict[str, Any]:
+        """Counts over the last `minutes` minutes: per minute, level, logger, and top errors."""
+        now = time.time()
+        start = format_ts(now - minutes * 60)[:16]
+        levels: Counter = Counter()
+        loggers: Counter = Counter()
+        errors: Dict[str, list] = {}
+        timeline: List[Dict[str, Any]] = []
+
+        with self._lock:
+            window = sorted((m, b) for m, b in self._buckets.items() if m >= start)
+            for minute, bucket in window:
+                levels.update(bucket.levels)
+                loggers.update(bucket.loggers)
+                timeline.append({
+                    "minute": minute,
+                    "total": sum(bucket.levels.values()),
+                    "levels": dict(bucket.levels),
+                })
+                for key, (count, example, logger_name, last_ts) in bucket.errors.items():
+                    total = errors.get(key)
+                    if total is None:
+                        errors[key] = [count, example, logger_name, last_ts]
+                    else:
+                        total[0] += count
+                        total[3] = max(total[3], last_ts)
+
+        top_errors = sorted(errors.items(), key=lambda item: item[1][0], reverse=True)[:top]
+        return {
+            "start": start,
+            "end": format_ts(now),
+            "ready": self.ready,
+            "total": sum(levels.values()),
+            "levels": dict(levels),
+            "loggers": dict(loggers.most_common()),
+            "timeline": timeline,
+            "topErrors": [
+                {"pattern": key, "count": count, "example": example, "logger": logger_name, "lastSeen": last_ts}
+                for key, (count, example, logger_name, last_ts) in top_errors
+            ],
+        }
+
+    def _backfill(self, path: str, end_offset: int):
+        start = format_ts(time.time() - settings.LOG_STATS_RETENTION_MINUTES * 60)
+        for entry in iter_range(path, start, end_offset=end_offset):
+            self.ingest(entry)
+
+    async def _run(self, path: str):
+        follower = LogFollower(path)
+        # Follow from the current end; backfill exactly the bytes before it,
+        # so no line is counted by both
+        offset = await asyncio.to_thread(follower.start)
+        try:
+            await asyncio.to_thread(self._backfill, path, offset)
+            self.ready = True
+            while True:
+                lines = await asyncio.to_thread(follower.poll)
+                for line in lines:
+                    self.ingest_line(line)
+                if not lines:
+                    await asyncio.sleep(_POLL_INTERVAL)
+        except Exception as e:
+            logger.error(f"LOGSTATS: aggregator stopped: {e}")
+            raise
+        finally:
+            follower.close()
+
+    def start(self, path: str):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(path))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+
+
+log_stats = LogStats()
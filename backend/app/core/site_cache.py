@@ -0,0 +1,99 @@
+"""
+Redis cache of serialized GET /sites/{site_id} responses, with ETags.
+
+Each site has a generation counter (`site:{id}:gen`) that is bumped after every
+committed change to the site, its pages or its domains. A cached response is
+stored together with the generation it was built from and is only served while
+that generation is still current. A reader that raced with a writer and cached
+pre-commit data therefore never wins: its entry carries the old generation.
+
+The cache is best-effort — any Redis error falls back to PostgreSQL.
+"""
+
+import hashlib
+import logging
+from typing import Optional, Tuple
+
+from redis.exceptions import RedisError
+
+from app.core import settings
+from app.core.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+
+def _gen_key(site_id: str) -> str:
+    return f"site:{site_id}:gen"
+
+
+def _resp_key(site_id: str) -> str:
+    return f"site:{site_id}:resp"
+
+
+def make_etag(body: bytes) -> str:
+    """Strong ETag for a serialized response body."""
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header (possibly a list / weak tags) against our ETag."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+    return etag in candidates
+
+
+async def lookup(site_id: str, user_id: str) -> Tuple[int, Optional[Tuple[str, str]]]:
+    """
+    Return (generation, cached) where cached is (etag, body) if a current entry
+    owned by user_id exists. The generation must be passed back to store().
+    """
+    try:
+        redis = await get_redis()
+        gen, entry = await redis.mget(_gen_key(site_id), _resp_key(site_id))
+    except RedisError as exc:
+        logger.warning(f"Site cache unavailable: {exc}")
+        return -1, None
+
+    gen = int(gen or 0)
+    if not entry:
+        return gen, None
+    cached_gen, owner, etag, body = entry.split("\n", 3)
+    if int(cached_gen) != gen or owner != user_id:
+        return gen, None
+    return gen, (etag, body)
+
+
+async def store(site_id: str, user_id: str, gen: int, body: bytes) -> str:
+    """Cache a freshly built response under the generation read by lookup(). Returns its ETag."""
+    etag = make_etag(body)
+    if gen < 0:
+        return etag
+    try:
+        redis = await get_redis()
+        await redis.set(
+            _resp_key(site_id),
+            f"{gen}\n{user_id}\n{etag}\n{body.decode()}",
+            ex=settings.SITE_CACHE_TTL,
+        )
+    except RedisError as exc:
+        logger.warning(f"Site cache store failed for {site_id}: {exc}")
+    return etag
+
+
+async def invalidate(site_id: str):
+    """
+    Bump the site generation and drop its cached response.
+    Must run after the transaction commits — schedule it as a BackgroundTask.
+    """
+    try:
+        redis = await get_redis()
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.incr(_gen_key(site_id))
+            pipe.delete(_resp_key(site_id))
+            await pipe.execute()
+    except RedisError as exc:
+        logger.warning(f"Site cache invalidation failed for {site_id}: {exc}")
+
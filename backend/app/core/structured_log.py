@@ -0,0 +1,222 @@
+"""
+Structured (JSON lines) application logging.
+
+Every record written to the log file is one JSON object:
+    {"ts": "2024-05-01T12:00:00.123Z", "level": "INFO", "logger": "app.request",
+     "msg": "...", "request_id": "...", "route": "/api/v1/sites/{site_id}",
+     "duration_ms": 12.3, "status": 200}
+`ts` is UTC with millisecond precision, so lines are time-ordered and compare
+as strings — the logs query endpoint binary-searches the file by it.
+
+RequestContextMiddleware assigns a request id (X-Request-ID, reused from the
+client when present), and RequestContextFilter stamps it and the route onto
+every record emitted while the request is handled.
+
+Records reach the file through DroppingQueueHandler + logging.handlers.QueueListener:
+the emitting thread (usually the event loop) only enqueues; formatting, file
+writes and rotation happen on the listener thread. The queue is bounded — when
+it is full new records are dropped and counted instead of blocking the caller.
+"""
+
+import copy
+import logging
+import logging.handlers
+import queue
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+import orjson
+
+_request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+# ASGI scope of the current request — routing stores the matched route in it
+_scope: ContextVar[Optional[Dict[str, Any]]] = ContextVar("scope", default=None)
+
+# Extra record attributes copied into the JSON line when present
+_EXTRA_FIELDS = ("request_id", "route", "method", "status", "duration_ms")
+
+request_logger = logging.getLogger("app.request")
+
+_EXC_FORMATTER = logging.Formatter()
+
+
+def _route_path(scope: Dict[str, Any]) -> Optional[str]:
+    """Route template of a request (e.g. /api/v1/sites/{site_id}) once it is routed."""
+    return getattr(scope.get("route"), "path", None)
+
+
+def format_ts(created: float) -> str:
+    """Timestamp format used in log lines (and for comparing against them)."""
+    dt = datetime.fromtimestamp(created, tz=timezone.utc)
+    return dt.strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+
+
+class RequestContextFilter(logging.Filter):
+    """Attach the current request id / route to records (runs in the emitting thread)."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if getattr(record, "request_id", None) is None:
+            record.request_id = _request_id.get()
+        if getattr(record, "route", None) is None:
+            scope = _scope.get()
+            record.route = _route_path(scope) if scope is not None else None
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as single-line JSON objects."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": format_ts(record.created),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for field in _EXTRA_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text  # formatted before crossing the queue
+        return orjson.dumps(entry, default=str).decode()
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler over a bounded queue that never blocks: when the queue is
+    full the record is dropped and counted. The next record that fits is
+    preceded by a WARNING with the number of records lost.
+    """
+
+    def __init__(self, maxsize: int):
+        super().__init__(queue.Queue(maxsize=maxsize))
+        self.maxsize = maxsize
+        self.enqueued = 0
+        self.dropped = 0
+        self.dropped_by_level: Dict[str, int] = {}
+        self._unreported = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        Resolve the message and traceback in the emitting thread (args may
+        change later), but keep the record structured for JsonFormatter —
+        the default prepare() flattens everything into msg.
+        """
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _EXC_FORMATTER.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        # Called under self.lock (Handler.handle), so the counters are safe
+        if self._unreported:
+            notice = logging.LogRecord(
+                "app.logging", logging.WARNING, __file__, 0,
+                f"LOGGING: dropped {self._unreported} records (log queue full)", None, None,
+            )
+            try:
+                self.queue.put_nowait(notice)
+                self._unreported = 0
+            except queue.Full:
+                pass
+        try:
+            self.queue.put_nowait(record)
+            self.enqueued += 1
+        except queue.Full:
+            self.dropped += 1
+            self._unreported += 1
+            self.dropped_by_level[record.levelname] = self.dropped_by_level.get(record.levelname, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self.queue.qsize(),
+            "capacity": self.maxsize,
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "droppedByLevel": dict(self.dropped_by_level),
+        }
+
+
+_queue_handler: Optional[DroppingQueueHandler] = None
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def start_queue_logging(*handlers: logging.Handler, maxsize: int) -> DroppingQueueHandler:
+    """Start a listener thread writing to handlers; returns the handler to attach to loggers."""
+    global _queue_handler, _listener
+    _queue_handler = DroppingQueueHandler(maxsize)
+    _queue_handler.addFilter(RequestContextFilter())
+    _listener = logging.handlers.QueueListener(_queue_handler.queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return _queue_handler
+
+
+def stop_queue_logging():
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def queue_stats() -> Optional[Dict[str, Any]]:
+    """Counters of the log queue (None if queue logging is not set up)."""
+    return _queue_handler.stats() if _queue_handler is not None else None
+
+
+class RequestContextMiddleware:
+    """
+    Pure ASGI middleware: request id + route context for logging, and one
+    `app.request` record per HTTP request with status and duration.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")[:64]
+                break
+        request_id = request_id or uuid.uuid4().hex
+        id_token = _request_id.set(request_id)
+        scope_token = _scope.set(scope)
+        status = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"x-request-id", request_id.encode()))
+                message["headers"] = headers
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration_ms = round((time.perf_counter() - started) * 1000, 2)
+            request_logger.info(
+                f"{scope['method']} {scope['path']} {status} {duration_ms}ms",
+                extra={
+                    "route": _route_path(scope) or scope["path"],
+                    "method": scope["method"],
+                    "status": status,
+                    "duration_ms": duration_ms,
+                },
+            )
+            _scope.reset(scope_token)
+            _request_id.reset(id_token)
@@ -0,0 +1,168 @@
+"""
+Resumable upload sessions (tus-style: one file, appended at known offsets).
+
+A session is two files in UPLOAD_DIR/.tmp/sessions:
+    <id>.part   the bytes received so far — its size is the upload offset
+    <id>.json   owner, file name, declared size and expiry
+
+Chunks are appended to the .part file in place, so finishing an upload needs
+no part assembly: the file is hashed and moved into the content-addressed
+store (app/core/upload_store.py) like a regular upload. The upload result is
+then kept in the metadata (`result`) until the session expires, so a retried
+final chunk gets the same answer instead of completing the upload again.
+Sessions are swept UPLOAD_SESSION_TTL after their last chunk.
+
+Functions here do blocking filesystem calls — run them via asyncio.to_thread.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+from app.core import settings
+
+logger = logging.getLogger(__name__)
+
+SESSIONS_DIR_NAME = os.path.join(".tmp", "sessions")
+
+_HASH_CHUNK = 1024 * 1024
+_SWEEP_INTERVAL = 600  # seconds between opportunistic sweeps per process
+_last_sweep: float = 0
+
+
+def _dir() -> str:
+    return os.path.join(settings.UPLOAD_DIR, SESSIONS_DIR_NAME)
+
+
+def part_path(session_id: str) -> str:
+    return os.path.join(_dir(), f"{session_id}.part")
+
+
+def _meta_path(session_id: str) -> str:
+    return os.path.join(_dir(), f"{session_id}.json")
+
+
+def _write_meta(session_id: str, meta: Dict[str, Any]):
+    tmp = _meta_path(session_id) + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp, _meta_path(session_id))
+
+
+def create(user_id: str, filename: str, ext: str, size: int) -> Dict[str, Any]:
+    os.makedirs(_dir(), exist_ok=True)
+    session_id = uuid.uuid4().hex
+    open(part_path(session_id), "wb").close()
+    meta = {
+        "id": session_id,
+        "userId": user_id,
+        "filename": filename,
+        "ext": ext,
+        "size": size,
+        "expiresAt": time.time() + settings.UPLOAD_SESSION_TTL,
+    }
+    _write_meta(session_id, meta)
+    return meta
+
+
+def load(session_id: str) -> Optional[Dict[str, Any]]:
+    """Session metadata with the current offset, or None if unknown or expired."""
+    if not session_id.isalnum():
+        return None
+    try:
+        with open(_meta_path(session_id)) as f:
+            meta = json.load(f)
+        if "result" in meta:
+            meta["offset"] = meta["size"]  # completed, the .part was moved into the store
+        else:
+            meta["offset"] = os.path.getsize(part_path(session_id))
+    except (FileNotFoundError, ValueError):
+        return None
+    if meta["expiresAt"] < time.time():
+        remove(session_id)
+        return None
+    return meta
+
+
+def touch(meta: Dict[str, Any]):
+    """Extend the expiry of an active session."""
+    meta = {k: v for k, v in meta.items() if k != "offset"}
+    meta["expiresAt"] = time.time() + settings.UPLOAD_SESSION_TTL
+    _write_meta(meta["id"], meta)
+
+
+def complete(meta: Dict[str, Any], result: Dict[str, Any]):
+    """Record the upload result of a session whose bytes were moved into the store."""
+    meta = {k: v for k, v in meta.items() if k != "offset"}
+    meta["result"] = result
+    _write_meta(meta["id"], meta)
+
+
+def remove(session_id: str):
+    for path in (part_path(session_id), _meta_path(session_id)):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def hash_file(path: str) -> str:
+    """sha256 of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(_HASH_CHUNK):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def sweep(force: bool = False) -> int:
+    """
+    Delete expired sessions and stale temp files of interrupted single-shot
+    uploads. Throttled to once per _SWEEP_INTERVAL unless forced.
+    Returns the number of files removed.
+    """
+    global _last_sweep
+    now = time.time()
+    if not force and now - _last_sweep < _SWEEP_INTERVAL:
+        return 0
+    _last_sweep = now
+
+    removed = 0
+    tmp_root = os.path.dirname(_dir())
+    for directory in (_dir(), tmp_root):
+        try:
+            entries = list(os.scandir(directory))
+        except FileNotFoundError:
+            continue
+        for entry in entries:
+            if not entry.is_file():
+                continue
+            expired = False
+            if entry.name.endswith(".json") and directory == _dir():
+                try:
+                    with open(entry.path) as f:
+                        expired = json.load(f)["expiresAt"] < now
+                except (FileNotFoundError, ValueError, KeyError):
+                    expired = True
+                if expired:
+                    remove(entry.name[:-len(".json")])
+                    removed += 1
+                continue
+            try:
+                stale = entry.stat().st_mtime < now - settings.UPLOAD_SESSION_TTL
+            except FileNotFoundError:
+                continue
+            if stale and entry.name.endswith(".part"):
+                # .part without metadata (or an abandoned single-shot upload)
+                try:
+                    os.remove(entry.path)
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+    if removed:
+        logger.info(f"UPLOADS: swept {removed} expired upload sessions / temp files")
+    return removed
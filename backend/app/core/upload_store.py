@@ -0,0 +1,136 @@
+"""
+Content-addressed, deduplicated storage for uploaded files.
+
+Each distinct content is stored once, named by its sha256 and sharded by the
+first two byte pairs of the hash:
+
+    UPLOAD_DIR/objects/ab/cd/abcd…ef.png      (blob)
+    UPLOAD_DIR/<user_id>/abcd…ef.png          (per-user reference)
+
+A user reference is a hard link to the blob, so the existing serving paths
+(/api/v1/uploads/{user_id}/{filename} and nginx /uploads/) keep working and
+the blob's link count is its reference count: a blob whose only remaining
+link is its own path is unreferenced and is deleted with the last reference
+(together with its resized variants, see app/core/image_variants.py).
+Because the name embeds the hash, a URL always refers to the same bytes and
+can be cached as immutable.
+
+store() and release() of the same content are serialized across processes by
+an flock on a striped lock file (UPLOAD_DIR/objects/.locks/ab.lock), so the
+link count always matches the references when it is read. Blobs are created
+with os.link, never replaced: an existing blob keeps its inode.
+
+Functions here do blocking filesystem calls — run them via asyncio.to_thread.
+"""
+
+import fcntl
+import os
+import re
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from app.core import settings
+
+OBJECTS_DIR_NAME = "objects"
+
+_EXT = re.compile(r"^\.[a-z0-9]{1,10}$")
+_CONTENT_NAME = re.compile(r"^([0-9a-f]{64})(\.[a-z0-9]{1,10})?$")
+
+
+def safe_ext(filename: str) -> str:
+    """Lower-cased extension of an uploaded file name, or '' if it is unusual."""
+    ext = os.path.splitext(filename)[1].lower()
+    return ext if _EXT.match(ext) else ""
+
+
+def content_name(sha256: str, ext: str) -> str:
+    return f"{sha256}{ext}"
+
+
+def parse_content_name(filename: str) -> Optional[str]:
+    """sha256 of a content-addressed file name, None for legacy (uuid) names."""
+    match = _CONTENT_NAME.match(filename)
+    return match.group(1) if match else None
+
+
+def blob_path(sha256: str, ext: str) -> str:
+    return os.path.join(
+        settings.UPLOAD_DIR, OBJECTS_DIR_NAME, sha256[:2], sha256[2:4], content_name(sha256, ext),
+    )
+
+
+def user_path(user_id: str, filename: str) -> str:
+    return os.path.join(settings.UPLOAD_DIR, user_id, filename)
+
+
+@contextmanager
+def _content_lock(sha256: str) -> Iterator[None]:
+    """Exclusive, cross-process lock for store/release of one content."""
+    lock_dir = os.path.join(settings.UPLOAD_DIR, OBJECTS_DIR_NAME, ".locks")
+    os.makedirs(lock_dir, exist_ok=True)
+    with open(os.path.join(lock_dir, f"{sha256[:2]}.lock"), "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)  # released when the file is closed
+        yield
+
+
+def _link(src: str, ref: str):
+    try:
+        os.link(src, ref)
+    except FileExistsError:
+        pass  # concurrent upload of the same content by this user
+
+
+def store(tmp_path: str, sha256: str, ext: str, user_id: str) -> bool:
+    """
+    Move a fully written temp file into the store and reference it for user_id.
+    The temp file is consumed. Returns True if the content was new to the store.
+    """
+    blob = blob_path(sha256, ext)
+    ref = user_path(user_id, content_name(sha256, ext))
+    os.makedirs(os.path.dirname(ref), exist_ok=True)
+    os.makedirs(os.path.dirname(blob), exist_ok=True)
+
+    try:
+        with _content_lock(sha256):
+            if os.path.exists(ref):
+                return False  # this user already references the content
+            try:
+                os.link(tmp_path, blob)
+            except FileExistsError:
+                _link(blob, ref)  # known content: reference the existing blob
+                return False
+            _link(blob, ref)
+            return True
+    finally:
+        os.remove(tmp_path)
+
+
+def release(user_id: str, filename: str) -> bool:
+    """
+    Drop a user's reference; delete the blob when no references remain.
+    Returns False if the user had no such file.
+    """
+    ref = user_path(user_id, filename)
+    sha256 = parse_content_name(filename)
+    if sha256 is None:
+        # Legacy per-user file, not in the store
+        try:
+            os.remove(ref)
+        except FileNotFoundError:
+            return False
+        return True
+
+    blob = blob_path(sha256, os.path.splitext(filename)[1])
+    with _content_lock(sha256):
+        try:
+            os.remove(ref)
+        except FileNotFoundError:
+            return False
+        try:
+            if os.stat(blob).st_nlink <= 1:
+                os.remove(blob)
+                from app.core import image_variants  # imports this module
+                image_variants.remove(sha256)
+        except FileNotFoundError:
+            pass
+    return True
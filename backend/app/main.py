@@ -2,6 +2,7 @@
 FastAPI application entry point.
 """
 
+import atexit
 import json
 import logging
 import logging.handlers
@@ -11,12 +12,18 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
-from starlette.middleware.gzip import GZipMiddleware
 
 from app.core import settings
 from app.core.mongodb import MongoDB
 from app.core.redis import close_redis
+from app.core.http import HttpClients
 from app.core.database import engine, Base
+from app.core.file_response import GZipExceptFilesMiddleware
+from app.core.log_reader import LOG_BACKUP_COUNT
+from app.core.log_stats import log_stats
+from app.core.structured_log import (
+    JsonFormatter, RequestContextMiddleware, start_queue_logging, stop_queue_logging,
+)
 from app.routers import sites, pages, blocks, uploads, auth, logs
 
 # ============================================
@@ -25,26 +32,30 @@ from app.routers import sites, pages, blocks, uploads, auth, logs
 LOG_FILE = "/tmp/app.log"
 
 def setup_file_logging():
-    """Configure rotating file handler so /api/v1/logs/app can read logs."""
+    """
+    Configure rotating file handler so /api/v1/logs/app can read logs.
+    Lines are JSON objects (app/core/structured_log.py) with request context.
+
+    Loggers only enqueue records (bounded, drops when full); the file writes
+    and rotation run on a QueueListener thread, off the event loop.
+    """
     file_handler = logging.handlers.RotatingFileHandler(
-        LOG_FILE, maxBytes=5 * 1024 * 1024, backupCount=3, encoding="utf-8"
+        LOG_FILE, maxBytes=5 * 1024 * 1024, backupCount=LOG_BACKUP_COUNT, encoding="utf-8"
     )
     file_handler.setLevel(logging.DEBUG)
-    formatter = logging.Formatter(
-        "%(asctime)s [%(levelname)s] %(name)s: %(message)s",
-        datefmt="%Y-%m-%d %H:%M:%S",
-    )
-    file_handler.setFormatter(formatter)
+    file_handler.setFormatter(JsonFormatter())
+    queue_handler = start_queue_logging(file_handler, maxsize=settings.LOG_QUEUE_SIZE)
+    atexit.register(stop_queue_logging)
 
     # Attach to root logger so all app logs are captured
     root = logging.getLogger()
-    root.addHandler(file_handler)
+    root.addHandler(queue_handler)
     root.setLevel(logging.INFO)
 
     # Also attach to uvicorn loggers
     for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
         uv_logger = logging.getLogger(name)
-        uv_logger.addHandler(file_handler)
+        uv_logger.addHandler(queue_handler)
 
 setup_file_logging()
 
@@ -54,6 +65,8 @@ async def lifespan(app: FastAPI):
     """Application startup/shutdown events."""
     # Startup
     MongoDB.connect()
+    HttpClients.connect()
+    log_stats.start(LOG_FILE)
 
     # Ensure tables exist (checkfirst=True skips existing tables)
     try:
@@ -65,7 +78,9 @@ async def lifespan(app: FastAPI):
     yield
 
     # Shutdown
+    await log_stats.stop()
     MongoDB.close()
+    await HttpClients.close()
     await close_redis()
     await engine.dispose()
 
@@ -87,8 +102,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Gzip
-app.add_middleware(GZipMiddleware, minimum_size=1000)
+# Gzip (not for served files, see app/core/file_response.py)
+app.add_middleware(GZipExceptFilesMiddleware, minimum_size=1000)
+
+# Request id / route / duration for structured logs (outermost: times the whole stack)
+app.add_middleware(RequestContextMiddleware)
 
 logger = logging.getLogger("uvicorn.error")
 
@@ -7,7 +7,7 @@ from datetime import datetime
 
 from sqlalchemy import (
     Column, String, Text, Boolean, DateTime, Integer,
-    ForeignKey, JSON, Enum as SAEnum
+    ForeignKey, JSON, Index, Enum as SAEnum
 )
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
@@ -33,13 +33,14 @@ class Site(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
 
     # Relationships
-    pages = relationship("Page", back_populates="site", cascade="all, delete-orphan", order_by="Page.created_at")
+    pages = relationship("Page", back_populates="site", cascade="all, delete-orphan", order_by="[Page.sort_order, Page.created_at]")
     domains = relationship("Domain", back_populates="site", cascade="all, delete-orphan")
 
 
 class Page(Base):
     """Page model - stored in PostgreSQL. Block content is in MongoDB."""
     __tablename__ = "pages"
+    __table_args__ = (Index("ix_pages_site_id_sort_order", "site_id", "sort_order"),)
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     site_id = Column(UUID(as_uuid=True), ForeignKey("sites.id", ondelete="CASCADE"), nullable=False)
@@ -55,7 +56,7 @@ class Page(Base):
     is_main = Column(Boolean, default=False)
     is_home_page = Column(Boolean, default=False)
     html_content = Column(Text, nullable=True)  # Raw HTML for imported pages
-    sort_order = Column(Integer, default=0)
+    sort_order = Column(Integer, default=0)  # gap-based key, see routers/pages.py
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
 
@@ -3,22 +3,23 @@ Auth router - proxy to parent project (app.akm-advisor.com).
 Validates JWT token and returns current user info.
 """
 
-import httpx
 from fastapi import APIRouter, Request, HTTPException, status
 from fastapi.responses import JSONResponse
 
-from app.core import settings
+from app.core.auth import get_user_profile
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
-EXTERNAL_AUTH_ME = f"{settings.EXTERNAL_AUTH_URL}/api/v1/auth/me"
-
 
 @router.get("/me")
 async def get_me(request: Request):
     """
     Validate JWT token against parent project and return user info.
     Reads Bearer token from Authorization header.
+
+    Answered from the shared token validation cache (app/core/auth.py), so
+    repeat calls within the TTL do not reach the parent. Cache state is
+    reported in X-Auth-Cache (hit / stale / miss) and X-Auth-Cache-TTL.
     """
     auth_header = request.headers.get("Authorization", "")
     if not auth_header.startswith("Bearer "):
@@ -28,29 +29,14 @@ async def get_me(request: Request):
         )
 
     token = auth_header.removeprefix("Bearer ")
-
-    try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.get(
-                EXTERNAL_AUTH_ME,
-                headers={"Authorization": f"Bearer {token}"},
-            )
-    except httpx.RequestError as e:
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail=f"Cannot reach auth service: {e}",
-        )
-
-    if response.status_code == 401:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid or expired token",
-        )
-
-    if response.status_code != 200:
-        raise HTTPException(
-            status_code=status.HTTP_502_BAD_GATEWAY,
-            detail=f"Auth service returned {response.status_code}",
-        )
-
-    return response.json()
+    profile, cache, ttl = await get_user_profile(token)
+
+    return JSONResponse(
+        content=profile,
+        headers={
+            "X-Auth-Cache": cache,
+            "X-Auth-Cache-TTL": str(ttl),
+            "Cache-Control": "private, no-cache",
+            "Vary": "Authorization",
+        },
+    )
@@ -5,14 +5,30 @@ Blocks API router - stores block content in MongoDB.
 from typing import List
 
 from fastapi import APIRouter, Depends
+from fastapi.responses import ORJSONResponse, Response
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from pydantic import TypeAdapter
 
 from app.core.mongodb import get_mongo
 from app.core.auth import get_current_user, CurrentUser
 from app.schemas import BlockSchema, BlocksSaveRequest, BlockTemplateSchema
 from app.data.block_templates import BLOCK_TEMPLATES
 
-router = APIRouter(tags=["blocks"])
+router = APIRouter(tags=["blocks"], default_response_class=ORJSONResponse)
+
+# Only the BlockSchema fields, so documents can be returned without re-validation
+_BLOCK_PROJECTION = {"_id": 0, "id": 1, "type": 1, "category": 1, "content": 1, "settings": 1, "order": 1}
+
+# The template library is static — validate and encode it once per process
+_templates_json: bytes = b""
+
+
+def _block_templates_json() -> bytes:
+    global _templates_json
+    if not _templates_json:
+        adapter = TypeAdapter(List[BlockTemplateSchema])
+        _templates_json = adapter.dump_json(adapter.validate_python(BLOCK_TEMPLATES))
+    return _templates_json
 
 
 @router.get("/pages/{page_id}/blocks", response_model=List[BlockSchema])
@@ -24,11 +40,15 @@ async def get_page_blocks(
     """Get all blocks for a page, ordered by 'order' field."""
     cursor = mongo.blocks.find(
         {"page_id": page_id},
-        {"_id": 0, "page_id": 0},
+        _BLOCK_PROJECTION,
     ).sort("order", 1)
 
     blocks = await cursor.to_list(length=500)
-    return blocks
+    for block in blocks:
+        block.setdefault("content", {})
+        block.setdefault("settings", {})
+        block.setdefault("order", 0)
+    return ORJSONResponse(blocks)
 
 
 @router.put("/pages/{page_id}/blocks")
@@ -59,4 +79,4 @@ async def get_block_templates(
     user: CurrentUser = Depends(get_current_user),
 ):
     """Get the block template library."""
-    return BLOCK_TEMPLATES
+    return Response(_block_templates_json(), media_type="application/json")
@@ -1,20 +1,40 @@
 """
 Logs API router - view server/container logs for debugging.
 Supports JWT auth, local Agent API key, and parent project agent key validation.
+
+Parent agent-key validations are cached in Redis (keyed by sha256 of the key,
+positive and negative results) and rate limited per key, so polling agents do
+not turn into a constant stream of calls to the parent project.
+
+/app/stream and /{service}/stream follow logs live as Server-Sent Events.
+/app/query filters the structured (JSON lines) app log by exact fields and
+time range, seeking to the window start by binary search. /app/stats answers
+from in-memory rollups (app/core/log_stats.py).
 """
 
 import asyncio
+import hashlib
 import os
 import logging
-from datetime import datetime
-from typing import Optional
+import re
+import time
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Callable, Dict, Optional
 
 import httpx
 from fastapi import APIRouter, Depends, HTTPException, Query, Request, Header
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from redis.exceptions import RedisError
 
 from app.core.auth import get_current_user, CurrentUser
 from app.core import settings
+from app.core.docker import container_logs, follow_logs
+from app.core.http import get_http_client, PARENT
+from app.core.log_reader import LogFollower, query_range, tail_lines
+from app.core.log_stats import log_stats
+from app.core.structured_log import format_ts, queue_stats
+from app.core.redis import get_redis
 
 router = APIRouter(prefix="/logs", tags=["logs"])
 
@@ -26,19 +46,79 @@ ALLOWED_SERVICES = {"api", "worker", "postgres", "mongodb", "redis", "nginx", "f
 # Agent API key from settings (set AGENT_API_KEY in .env)
 AGENT_API_KEY = settings.AGENT_API_KEY
 
+# Live streams: per-client line buffer (oldest lines dropped when full),
+# max lines coalesced into one SSE event, keep-alive and file poll intervals
+STREAM_BUFFER_LINES = 1000
+STREAM_BATCH_LINES = 200
+STREAM_HEARTBEAT = 15.0  # seconds
+APP_LOG_POLL_INTERVAL = 0.5  # seconds
+
+# Any line break ends an SSE field, so text is split on all of them
+_SSE_LINE_BREAK = re.compile(r"\r\n|\r|\n")
+
 
-async def _validate_agent_key_via_parent(agent_key: str) -> bool:
-    """Validate agent key by calling parent project context endpoint."""
+async def _validate_agent_key_via_parent(agent_key: str) -> Optional[bool]:
+    """
+    Validate agent key by calling parent project context endpoint.
+    Returns None when the parent could not decide (network error, 5xx).
+    """
     project_id = settings.AGENT_PROJECT_ID
     if not project_id:
         return False
     url = f"{settings.EXTERNAL_AUTH_URL}/api/v1/agent/{project_id}/context"
     try:
-        async with httpx.AsyncClient(timeout=5) as client:
-            resp = await client.get(url, headers={"X-Agent-Key": agent_key})
-            return resp.status_code == 200
-    except Exception:
-        return False
+        resp = await get_http_client(PARENT).get(url, headers={"X-Agent-Key": agent_key}, timeout=5)
+    except httpx.HTTPError as e:
+        logger.warning(f"Agent key validation failed: {e}")
+        return None
+    if resp.status_code == 200:
+        return True
+    if resp.status_code >= 500:
+        return None
+    return False
+
+
+async def _check_agent_key(agent_key: str) -> bool:
+    """
+    Cached, rate-limited agent key validation.
+    Results are shared by all workers for AGENT_KEY_CACHE_TTL (valid) or
+    AGENT_KEY_NEGATIVE_TTL (rejected); parent calls per key are limited to
+    AGENT_KEY_VALIDATIONS_PER_MINUTE, beyond that the request gets 429.
+    """
+    key = "agentkey:" + hashlib.sha256(agent_key.encode()).hexdigest()
+    window = int(time.time() // 60)
+    rl_key = f"{key}:rl:{window}"
+
+    try:
+        redis = await get_redis()
+        cached = await redis.get(key)
+        if cached is not None:
+            return cached == "1"
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.incr(rl_key)
+            pipe.expire(rl_key, 60)
+            calls, _ = await pipe.execute()
+    except RedisError as e:
+        logger.warning(f"Agent key cache unavailable: {e}")
+        return bool(await _validate_agent_key_via_parent(agent_key))
+
+    if calls > settings.AGENT_KEY_VALIDATIONS_PER_MINUTE:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many agent key validations, retry later",
+            headers={"Retry-After": "60"},
+        )
+
+    valid = await _validate_agent_key_via_parent(agent_key)
+    if valid is None:
+        return False  # parent undecided — do not cache
+
+    ttl = settings.AGENT_KEY_CACHE_TTL if valid else settings.AGENT_KEY_NEGATIVE_TTL
+    try:
+        await redis.set(key, "1" if valid else "0", ex=ttl)
+    except RedisError as e:
+        logger.warning(f"Agent key cache store failed: {e}")
+    return valid
 
 
 async def verify_logs_access(
@@ -62,7 +142,7 @@ async def verify_logs_access(
     # Validate agent key via parent project API
     key_to_check = x_agent_key or (auth_header[7:] if auth_header.startswith("Bearer ") else None)
     if key_to_check and key_to_check.startswith("agent_"):
-        if await _validate_agent_key_via_parent(key_to_check):
+        if await _check_agent_key(key_to_check):
             return
 
     # Fallback to standard JWT auth
@@ -89,6 +169,16 @@ class LogEntry(BaseModel):
     timestamp: str
 
 
+class LogQueryResponse(BaseModel):
+    """Structured app log entries matching a query."""
+    entries: list[dict]
+    count: int
+    truncated: bool
+    start: Optional[str]
+    end: Optional[str]
+    timestamp: str
+
+
 class LogsListResponse(BaseModel):
     """Available services list."""
     services: list[str]
@@ -116,26 +206,21 @@ async def get_app_logs(
 ):
     """
     Get application-level Python/uvicorn logs from the API container.
-    Reads from /tmp/app.log if file logging is configured,
-    otherwise falls back to Docker logs for 'api' service.
+    Reads from /tmp/app.log (and its rotated backups) if file logging is
+    configured, otherwise falls back to Docker logs for 'api' service.
     """
-    # Try file-based log first
+    # Try file-based log first: read backwards until `tail` matching lines
     log_file = os.environ.get("APP_LOG_FILE", "/tmp/app.log")
     if os.path.exists(log_file):
+        match = _line_matcher(search, level)
         try:
-            with open(log_file, "r") as f:
-                all_lines = f.readlines()
-        except Exception as e:
+            lines = await asyncio.to_thread(tail_lines, log_file, tail, match)
+        except OSError as e:
             raise HTTPException(status_code=500, detail=f"Cannot read log file: {e}")
     else:
         # Fallback to docker logs for api container
-        all_lines = await _docker_logs("sb-api", tail=tail * 2)
-
-    # Apply filters
-    lines = _filter_lines(all_lines, search=search, level=level)
-
-    # Tail
-    lines = lines[-tail:]
+        all_lines = await container_logs("sb-api", tail=tail * 2)
+        lines = _filter_lines(all_lines, search=search, level=level)[-tail:]
 
     return LogEntry(
         service="app",
@@ -146,12 +231,133 @@ async def get_app_logs(
     )
 
 
+@router.get("/app/query", response_model=LogQueryResponse)
+async def query_app_logs(
+    start: Optional[datetime] = Query(None, description="Window start, ISO 8601 (UTC if no offset)"),
+    end: Optional[datetime] = Query(None, description="Window end, ISO 8601 (UTC if no offset)"),
+    level: Optional[str] = Query(None, description="Exact log level: ERROR, WARNING, INFO, DEBUG"),
+    logger_name: Optional[str] = Query(None, alias="logger", description="Exact logger name"),
+    request_id: Optional[str] = Query(None, description="Exact request id (X-Request-ID)"),
+    route: Optional[str] = Query(None, description="Exact route template, e.g. /api/v1/sites/{site_id}"),
+    status: Optional[int] = Query(None, description="Exact response status (app.request entries)"),
+    limit: int = Query(1000, ge=1, le=5000, description="Max entries to return (oldest first)"),
+    _auth=Depends(verify_logs_access),
+):
+    """
+    Query structured application logs by exact field values within a time window.
+    The window start is located by binary search over file offsets, so the cost
+    depends on the size of the window, not of the log.
+    """
+    log_file = os.environ.get("APP_LOG_FILE", "/tmp/app.log")
+    if not os.path.exists(log_file):
+        raise HTTPException(status_code=404, detail="Application log file is not configured")
+
+    fields: Dict[str, Any] = {
+        "level": level.upper() if level else None,
+        "logger": logger_name,
+        "request_id": request_id,
+        "route": route,
+        "status": status,
+    }
+    fields = {k: v for k, v in fields.items() if v is not None}
+    match = (lambda entry: all(entry.get(k) == v for k, v in fields.items())) if fields else None
+
+    start_ts = _log_ts(start)
+    end_ts = _log_ts(end)
+    entries, truncated = await asyncio.to_thread(query_range, log_file, start_ts, end_ts, match, limit)
+
+    return LogQueryResponse(
+        entries=entries,
+        count=len(entries),
+        truncated=truncated,
+        start=start_ts,
+        end=end_ts,
+        timestamp=datetime.utcnow().isoformat() + "Z",
+    )
+
+
+@router.get("/app/stats")
+async def get_app_log_stats(
+    minutes: int = Query(60, ge=1, le=24 * 60, description="Window size in minutes, ending now"),
+    top: int = Query(10, ge=1, le=100, description="Number of top recurring errors"),
+    _auth=Depends(verify_logs_access),
+):
+    """
+    Application log counts over a time window: per minute, per level, per
+    logger, plus the top recurring ERROR messages (grouped with numbers and
+    ids masked). Served from rollups maintained by a background aggregator;
+    `ready` is false while it is still backfilling from the log files.
+    """
+    minutes = min(minutes, settings.LOG_STATS_RETENTION_MINUTES)
+    return log_stats.snapshot(minutes, top=top)
+
+
+@router.get("/app/pipeline")
+async def get_log_pipeline_stats(
+    _auth=Depends(verify_logs_access),
+):
+    """
+    Counters of the application log queue: records queued for the writer
+    thread, capacity, records enqueued and dropped (total and per level).
+    """
+    stats = queue_stats()
+    if stats is None:
+        raise HTTPException(status_code=404, detail="Queued file logging is not configured")
+    return stats
+
+
+@router.get("/app/stream")
+async def stream_app_logs(
+    tail: int = Query(0, ge=0, le=1000, description="Number of last lines to send before following"),
+    search: Optional[str] = Query(None, description="Filter lines containing this text (case-insensitive)"),
+    level: Optional[str] = Query(None, description="Filter by log level: ERROR, WARNING, INFO, DEBUG"),
+    _auth=Depends(verify_logs_access),
+):
+    """
+    Follow application logs (/tmp/app.log) as Server-Sent Events.
+    Events: `log` (one `data:` line per log line), `dropped` (lines skipped
+    because the client fell behind), `error`. Comments are sent as keep-alive.
+    """
+    log_file = os.environ.get("APP_LOG_FILE", "/tmp/app.log")
+    if not os.path.exists(log_file):
+        raise HTTPException(status_code=404, detail="Application log file is not configured")
+
+    match = _line_matcher(search, level)
+    return _sse_response(_follow_app_log(log_file, tail, match), match)
+
+
+@router.get("/{service}/stream")
+async def stream_service_logs(
+    service: str,
+    tail: int = Query(0, ge=0, le=1000, description="Number of last lines to send before following"),
+    search: Optional[str] = Query(None, description="Filter lines containing this text (case-insensitive)"),
+    level: Optional[str] = Query(None, description="Filter by log level: ERROR, WARNING, INFO, DEBUG"),
+    timestamps: bool = Query(False, description="Prefix lines with Docker timestamps"),
+    _auth=Depends(verify_logs_access),
+):
+    """Follow Docker container logs for a service as Server-Sent Events (see /app/stream)."""
+    if service not in ALLOWED_SERVICES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown service '{service}'. Allowed: {sorted(ALLOWED_SERVICES)}",
+        )
+    if not os.path.exists(settings.DOCKER_SOCKET):
+        raise HTTPException(
+            status_code=500,
+            detail="docker.sock not available. Mount /var/run/docker.sock to enable log access.",
+        )
+
+    lines = follow_logs(f"sb-{service}", tail=tail, timestamps=timestamps)
+    return _sse_response(lines, _line_matcher(search, level))
+
+
 @router.get("/{service}", response_model=LogEntry)
 async def get_service_logs(
     service: str,
     tail: int = Query(100, ge=1, le=5000, description="Number of last lines to return"),
     search: Optional[str] = Query(None, description="Filter lines containing this text (case-insensitive)"),
-    since: Optional[str] = Query(None, description="Show logs since (e.g. '1h', '30m', '2h30m')"),
+    since: Optional[str] = Query(None, description="Show logs since (e.g. '1h', '30m', '2h30m' or '2024-01-01T00:00:00Z')"),
+    timestamps: bool = Query(False, description="Prefix lines with Docker timestamps"),
     _auth=Depends(verify_logs_access),
 ):
     """
@@ -165,7 +371,9 @@ async def get_service_logs(
         )
 
     container_name = f"sb-{service}"
-    lines = await _docker_logs(container_name, tail=tail * 2 if search else tail, since=since)
+    lines = await container_logs(
+        container_name, tail=tail * 2 if search else tail, since=since, timestamps=timestamps,
+    )
 
     # Apply search filter
     if search:
@@ -182,72 +390,133 @@ async def get_service_logs(
     )
 
 
-async def _docker_logs(
-    container_name: str,
-    tail: int = 100,
-    since: Optional[str] = None,
-) -> list[str]:
-    """Get container logs. Tries docker CLI first, falls back to curl via unix socket."""
-    # Try docker CLI first
-    try:
-        cmd = ["docker", "logs", "--tail", str(tail)]
-        if since:
-            cmd.extend(["--since", since])
-        cmd.append(container_name)
-
-        proc = await asyncio.create_subprocess_exec(
-            *cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
-        )
-        stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout=15)
-        output = stdout.decode("utf-8", errors="replace") + stderr.decode("utf-8", errors="replace")
-        return output.splitlines()
+# ── Live streaming (SSE) ──────────────────────────────────────────────────────
 
-    except FileNotFoundError:
-        pass  # docker CLI not installed, try curl fallback
+async def _follow_app_log(
+    log_file: str,
+    tail: int,
+    match: Optional[Callable[[str], bool]],
+) -> AsyncIterator[str]:
+    """Yield the last `tail` matching lines, then new lines as they are written."""
+    follower = LogFollower(log_file)
+    # History ends where following starts: no line is sent twice or skipped
+    offset = await asyncio.to_thread(follower.start)
+    try:
+        if tail:
+            history = await asyncio.to_thread(tail_lines, log_file, tail, match, end=offset)
+            for line in history:
+                yield line
+        while True:
+            lines = await asyncio.to_thread(follower.poll)
+            for line in lines:
+                yield line
+            if not lines:
+                await asyncio.sleep(APP_LOG_POLL_INTERVAL)
+    finally:
+        follower.close()
+
+
+def _sse_data(text: str) -> str:
+    """`data:` field lines for text; embedded line breaks become separate data lines."""
+    return "".join(f"data: {part}\n" for part in _SSE_LINE_BREAK.split(text))
+
+
+def _sse_response(
+    lines: AsyncIterator[str],
+    match: Optional[Callable[[str], bool]],
+) -> StreamingResponse:
+    return StreamingResponse(
+        _sse_events(lines, match),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-    # Fallback: use curl via docker unix socket API
-    docker_sock = "/var/run/docker.sock"
-    if not os.path.exists(docker_sock):
-        raise HTTPException(
-            status_code=500,
-            detail="Neither Docker CLI nor docker.sock available. "
-                   "Mount /var/run/docker.sock to enable log access.",
-        )
 
+async def _sse_events(
+    lines: AsyncIterator[str],
+    match: Optional[Callable[[str], bool]],
+) -> AsyncIterator[str]:
+    """
+    Turn a line source into SSE events. The source is read by a separate task
+    into a bounded buffer, so a slow client never stalls it: when the buffer
+    is full the oldest lines are dropped (and reported in a `dropped` event),
+    and whatever is buffered is coalesced into one `log` event.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=STREAM_BUFFER_LINES)
+    dropped = 0
+
+    async def produce():
+        nonlocal dropped
+        async for line in lines:
+            if match is not None and not match(line):
+                continue
+            if queue.full():
+                queue.get_nowait()
+                dropped += 1
+            queue.put_nowait(line)
+
+    producer = asyncio.create_task(produce())
     try:
-        url = f"http://localhost/containers/{container_name}/logs?stdout=true&stderr=true&tail={tail}"
-        if since:
-            url += f"&since={since}"
-
-        cmd = ["curl", "-s", "--unix-socket", docker_sock, url]
-        proc = await asyncio.create_subprocess_exec(
-            *cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
-        )
-        stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout=15)
-        output = stdout.decode("utf-8", errors="replace")
-        # Docker log stream has 8-byte header frames; strip control chars
-        lines = []
-        for line in output.splitlines():
-            # Remove non-printable prefix bytes from docker stream multiplexing
-            cleaned = line.lstrip("\x00\x01\x02\x03\x04\x05\x06\x07\x08")
-            if cleaned:
-                lines.append(cleaned)
-        return lines
+        while True:
+            if producer.done() and queue.empty():
+                if not producer.cancelled() and producer.exception():
+                    yield f"event: error\n{_sse_data(str(producer.exception()))}\n"
+                break
+            getter = asyncio.ensure_future(queue.get())
+            await asyncio.wait({getter, producer}, timeout=STREAM_HEARTBEAT, return_when=asyncio.FIRST_COMPLETED)
+            if not getter.done():
+                getter.cancel()
+                if not producer.done():
+                    yield ": keep-alive\n\n"
+                continue
+            batch = [getter.result()]
+            while len(batch) < STREAM_BATCH_LINES and not queue.empty():
+                batch.append(queue.get_nowait())
+            if dropped:
+                yield f"event: dropped\ndata: {dropped}\n\n"
+                dropped = 0
+            yield "event: log\n" + "".join(_sse_data(line) for line in batch) + "\n"
+    finally:
+        producer.cancel()
+
+
+def _line_matcher(
+    search: Optional[str] = None,
+    level: Optional[str] = None,
+) -> Optional[Callable[[str], bool]]:
+    """Per-line filter for search/level, or None when there is nothing to filter."""
+    if not (search or level):
+        return None
+    return lambda line: _line_matches(line, search=search, level=level)
 
-    except asyncio.TimeoutError:
-        raise HTTPException(status_code=504, detail="Timeout reading container logs")
-    except FileNotFoundError:
-        raise HTTPException(
-            status_code=500,
-            detail="curl not available in container for docker socket fallback.",
-        )
-    except Exception as e:
-        logger.error(f"Failed to read docker logs for {container_name}: {e}")
-        raise HTTPException(status_code=500, detail=f"Failed to read logs: {e}")
+
+def _line_matches(
+    line: str,
+    search: Optional[str] = None,
+    level: Optional[str] = None,
+) -> bool:
+    """
+    Check a single log line against search text and/or log level.
+    Structured (JSON) lines match the level field exactly; plain lines by substring.
+    """
+    if level:
+        if line.startswith("{"):
+            if f'"level":"{level.upper()}"' not in line:
+                return False
+        elif level.upper() not in line.upper():
+            return False
+    if search and search.lower() not in line.lower():
+        return False
+    return True
+
+
+def _log_ts(value: Optional[datetime]) -> Optional[str]:
+    """Convert a query datetime to the `ts` format of structured log lines."""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_ts(value.timestamp())
 
 
 def _filter_lines(
@@ -256,14 +525,6 @@ def _filter_lines(
     level: Optional[str] = None,
 ) -> list[str]:
     """Filter log lines by search text and/or log level."""
-    result = lines
-
-    if level:
-        level_upper = level.upper()
-        result = [l for l in result if level_upper in l.upper()]
-
-    if search:
-        search_lower = search.lower()
-        result = [l for l in result if search_lower in l.lower()]
-
-    return result
+    if not (search or level):
+        return lines
+    return [l for l in lines if _line_matches(l, search=search, level=level)]
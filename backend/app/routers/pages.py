@@ -4,18 +4,33 @@ Pages API router - CRUD operations for site pages.
 
 import uuid
 from datetime import datetime
-from typing import List
+from typing import Dict, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import select
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import select, insert, func
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database import get_db
 from app.core.auth import get_current_user, CurrentUser
+from app.core import site_cache
 from app.models import Site, Page
-from app.schemas import PageResponse, PageCreateRequest, PageUpdateRequest, SeoSchema
+from app.schemas import (
+    PageResponse, PageCreateRequest, PageUpdateRequest,
+    PageBatchUpdateRequest, PageBulkCreateRequest,
+)
+from app.schemas.serializers import page_to_dict
 
-router = APIRouter(prefix="/sites/{site_id}/pages", tags=["pages"])
+router = APIRouter(
+    prefix="/sites/{site_id}/pages", tags=["pages"], default_response_class=ORJSONResponse
+)
+
+# Pages are ordered by gap-based integer keys: a move takes the midpoint between
+# its new neighbours, so only the moved row is written. The whole site is
+# renumbered only when two neighbours have no free key left between them.
+# Requests that assign keys lock the site row first (_get_user_site with
+# for_update), so concurrent creates or moves never compute the same key.
+SORT_ORDER_GAP = 1024
 
 
 def _slugify(text: str) -> str:
@@ -27,61 +42,149 @@ def _slugify(text: str) -> str:
     return slug.strip('-')
 
 
-def _page_to_response(page: Page) -> PageResponse:
-    return PageResponse(
-        id=str(page.id),
-        siteId=str(page.site_id),
-        title=page.title,
-        slug=page.slug,
-        blocks=[],
-        htmlContent=page.html_content,
-        seo=SeoSchema(
-            title=page.seo_title or "",
-            description=page.seo_description or "",
-            keywords=page.seo_keywords,
-            ogImage=page.seo_og_image,
-            canonicalUrl=page.seo_canonical_url,
-            noIndex=page.seo_no_index,
-        ),
-        status=page.status,
-        isMain=page.is_main,
-        isHomePage=page.is_home_page,
-        createdAt=page.created_at.isoformat() + "Z",
-        updatedAt=page.updated_at.isoformat() + "Z",
-    )
-
-
-async def _get_user_site(site_id: str, user: CurrentUser, db: AsyncSession) -> Site:
-    """Helper to get and verify site ownership."""
-    result = await db.execute(
-        select(Site).where(Site.id == uuid.UUID(site_id), Site.user_id == user.user_id)
-    )
+async def _get_user_site(
+    site_id: str, user: CurrentUser, db: AsyncSession, for_update: bool = False,
+) -> Site:
+    """
+    Helper to get and verify site ownership. With for_update the site row is
+    locked until the transaction ends (serializes sort_order assignment).
+    """
+    query = select(Site).where(Site.id == uuid.UUID(site_id), Site.user_id == user.user_id)
+    if for_update:
+        query = query.with_for_update()
+    result = await db.execute(query)
     site = result.scalar_one_or_none()
     if not site:
         raise HTTPException(status_code=404, detail="Site not found")
     return site
 
 
+def _apply_page_update(page: Page, update_data: dict) -> None:
+    """Copy PageUpdateRequest fields (already dumped with exclude_unset) onto the ORM row."""
+    if "title" in update_data:
+        page.title = update_data["title"]
+    if "slug" in update_data:
+        page.slug = update_data["slug"]
+    if "status" in update_data:
+        page.status = update_data["status"]
+    if "isMain" in update_data:
+        page.is_main = update_data["isMain"]
+    if "isHomePage" in update_data:
+        page.is_home_page = update_data["isHomePage"]
+    if "htmlContent" in update_data:
+        page.html_content = update_data["htmlContent"]
+    if "seo" in update_data and update_data["seo"]:
+        seo = update_data["seo"]
+        page.seo_title = seo.get("title", page.seo_title)
+        page.seo_description = seo.get("description", page.seo_description)
+        page.seo_keywords = seo.get("keywords", page.seo_keywords)
+        page.seo_og_image = seo.get("ogImage", page.seo_og_image)
+        page.seo_canonical_url = seo.get("canonicalUrl", page.seo_canonical_url)
+        page.seo_no_index = seo.get("noIndex", page.seo_no_index)
+
+
+def _sort_key_between(prev: Optional[int], nxt: Optional[int]) -> Optional[int]:
+    """Return an integer key strictly between two neighbours, or None if there is no gap."""
+    if prev is None and nxt is None:
+        return SORT_ORDER_GAP
+    if prev is None:
+        return nxt - SORT_ORDER_GAP
+    if nxt is None:
+        return prev + SORT_ORDER_GAP
+    if nxt - prev < 2:
+        return None
+    return (prev + nxt) // 2
+
+
+def _move_page(ordered: List[Page], page: Page, after: Optional[Page]) -> None:
+    """Move page right after `after` (None = first) within the ordered list, updating sort keys."""
+    ordered.remove(page)
+    index = ordered.index(after) + 1 if after is not None else 0
+    prev = ordered[index - 1].sort_order if index > 0 else None
+    nxt = ordered[index].sort_order if index < len(ordered) else None
+    ordered.insert(index, page)
+
+    key = _sort_key_between(prev, nxt)
+    if key is not None:
+        page.sort_order = key
+        return
+
+    # No room left between the neighbours — spread the whole site out again
+    for i, p in enumerate(ordered):
+        p.sort_order = (i + 1) * SORT_ORDER_GAP
+
+
 @router.post("", response_model=PageResponse, status_code=201)
 async def create_page(
     site_id: str,
     data: PageCreateRequest,
+    background_tasks: BackgroundTasks,
     user: CurrentUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
     """Create a new page in a site."""
-    await _get_user_site(site_id, user, db)
+    site = await _get_user_site(site_id, user, db, for_update=True)
 
     slug = data.slug or _slugify(data.title)
+    last_key = await db.scalar(
+        select(func.max(Page.sort_order)).where(Page.site_id == uuid.UUID(site_id))
+    )
     page = Page(
         site_id=uuid.UUID(site_id),
         title=data.title,
         slug=slug,
         seo_title=data.title,
+        sort_order=(last_key or 0) + SORT_ORDER_GAP,
     )
     db.add(page)
     await db.flush()
-    return _page_to_response(page)
+    background_tasks.add_task(site_cache.invalidate, str(site.id))
+    return ORJSONResponse(page_to_dict(page), status_code=201)
+
+
+@router.post(":bulkCreate", response_model=List[PageResponse], status_code=201)
+async def bulk_create_pages(
+    site_id: str,
+    data: PageBulkCreateRequest,
+    background_tasks: BackgroundTasks,
+    user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Create many pages (e.g. from a ZIP import) with one multi-row INSERT.
+    Pages are appended after the existing ones in request order.
+    """
+    site = await _get_user_site(site_id, user, db, for_update=True)
+
+    site_uuid = uuid.UUID(site_id)
+    last_key = await db.scalar(
+        select(func.max(Page.sort_order)).where(Page.site_id == site_uuid)
+    )
+    last_key = last_key or 0
+    now = datetime.utcnow()
+    rows = [
+        {
+            "id": uuid.uuid4(),
+            "site_id": site_uuid,
+            "title": item.title,
+            "slug": item.slug if item.slug is not None else _slugify(item.title),
+            "seo_title": item.title,
+            "html_content": item.htmlContent,
+            "is_main": bool(item.isMain),
+            "is_home_page": bool(item.isHomePage),
+            "sort_order": last_key + (i + 1) * SORT_ORDER_GAP,
+            "created_at": now,
+            "updated_at": now,
+        }
+        for i, item in enumerate(data.pages)
+    ]
+
+    result = await db.scalars(
+        insert(Page).returning(Page, sort_by_parameter_order=True),
+        rows,
+    )
+    background_tasks.add_task(site_cache.invalidate, str(site.id))
+    return ORJSONResponse([page_to_dict(p) for p in result.all()], status_code=201)
 
 
 @router.patch("/{page_id}", response_model=PageResponse)
@@ -89,11 +192,12 @@ async def update_page(
     site_id: str,
     page_id: str,
     data: PageUpdateRequest,
+    background_tasks: BackgroundTasks,
     user: CurrentUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
     """Partial update of a page."""
-    await _get_user_site(site_id, user, db)
+    site = await _get_user_site(site_id, user, db)
 
     result = await db.execute(
         select(Page).where(
@@ -105,43 +209,74 @@ async def update_page(
     if not page:
         raise HTTPException(status_code=404, detail="Page not found")
 
-    update_data = data.model_dump(exclude_unset=True)
-
-    if "title" in update_data:
-        page.title = update_data["title"]
-    if "slug" in update_data:
-        page.slug = update_data["slug"]
-    if "status" in update_data:
-        page.status = update_data["status"]
-    if "isMain" in update_data:
-        page.is_main = update_data["isMain"]
-    if "isHomePage" in update_data:
-        page.is_home_page = update_data["isHomePage"]
-    if "htmlContent" in update_data:
-        page.html_content = update_data["htmlContent"]
-    if "seo" in update_data and update_data["seo"]:
-        seo = update_data["seo"]
-        page.seo_title = seo.get("title", page.seo_title)
-        page.seo_description = seo.get("description", page.seo_description)
-        page.seo_keywords = seo.get("keywords", page.seo_keywords)
-        page.seo_og_image = seo.get("ogImage", page.seo_og_image)
-        page.seo_canonical_url = seo.get("canonicalUrl", page.seo_canonical_url)
-        page.seo_no_index = seo.get("noIndex", page.seo_no_index)
+    _apply_page_update(page, data.model_dump(exclude_unset=True))
 
     page.updated_at = datetime.utcnow()
     await db.flush()
-    return _page_to_response(page)
+    background_tasks.add_task(site_cache.invalidate, str(site.id))
+    return ORJSONResponse(page_to_dict(page))
+
+
+@router.post(":batchUpdate", response_model=List[PageResponse])
+async def batch_update_pages(
+    site_id: str,
+    data: PageBatchUpdateRequest,
+    background_tasks: BackgroundTasks,
+    user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Apply many page updates (fields and/or moves) in a single transaction.
+    Items are applied in request order; returns all site pages in their new order.
+    """
+    site = await _get_user_site(site_id, user, db, for_update=True)
+
+    result = await db.execute(
+        select(Page).where(Page.site_id == uuid.UUID(site_id))
+    )
+    pages: Dict[str, Page] = {str(p.id): p for p in result.scalars().all()}
+    ordered = sorted(pages.values(), key=lambda p: (p.sort_order or 0, p.created_at))
+    for p in ordered:
+        p.sort_order = p.sort_order or 0
+
+    now = datetime.utcnow()
+    for item in data.pages:
+        page = pages.get(item.id)
+        if page is None:
+            raise HTTPException(status_code=404, detail=f"Page not found: {item.id}")
+
+        update_data = item.model_dump(exclude_unset=True, exclude={"id", "move"})
+        _apply_page_update(page, update_data)
+
+        if item.move is not None:
+            after = None
+            if item.move.afterId:
+                after = pages.get(item.move.afterId)
+                if after is None or after is page:
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"Invalid move target for page {item.id}: {item.move.afterId}",
+                    )
+            _move_page(ordered, page, after)
+
+        if update_data or item.move is not None:
+            page.updated_at = now
+
+    await db.flush()
+    background_tasks.add_task(site_cache.invalidate, str(site.id))
+    return ORJSONResponse([page_to_dict(p) for p in ordered])
 
 
 @router.delete("/{page_id}", status_code=204)
 async def delete_page(
     site_id: str,
     page_id: str,
+    background_tasks: BackgroundTasks,
     user: CurrentUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
-    """Delete a page."""
-    await _get_user_site(site_id, user, db)
+    """Delete a page. Its Mongo blocks are removed in the background."""
+    site = await _get_user_site(site_id, user, db)
 
     result = await db.execute(
         select(Page).where(
@@ -155,16 +290,21 @@ async def delete_page(
 
     await db.delete(page)
 
+    from app.tasks.cleanup import cleanup_pages_task
+    background_tasks.add_task(cleanup_pages_task, [str(page.id)])
+    background_tasks.add_task(site_cache.invalidate, str(site.id))
+
 
 @router.post("/{page_id}/publish")
 async def publish_page(
     site_id: str,
     page_id: str,
+    background_tasks: BackgroundTasks,
     user: CurrentUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
     """Publish a single page."""
-    await _get_user_site(site_id, user, db)
+    site = await _get_user_site(site_id, user, db)
 
     result = await db.execute(
         select(Page).where(
@@ -180,4 +320,5 @@ async def publish_page(
     page.updated_at = datetime.utcnow()
     await db.flush()
 
+    background_tasks.add_task(site_cache.invalidate, str(site.id))
     return {"status": "published"}
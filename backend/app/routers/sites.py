@@ -11,9 +11,11 @@ import logging
 import secrets
 import string
 from datetime import datetime
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
+import orjson
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException, status
+from fastapi.responses import ORJSONResponse, Response
 from sqlalchemy import select
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -21,76 +23,19 @@ from sqlalchemy.orm import selectinload
 
 from app.core.database import get_db
 from app.core.auth import get_current_user, CurrentUser
-from app.core import settings
+from app.core import settings, site_cache
+from app.core.docker import kill_container
 from app.models import Site, Page, Domain
 from app.schemas import (
     SiteResponse, SiteCreateRequest, SiteUpdateRequest,
-    PageResponse, SeoSchema, DomainResponse, DomainCreateRequest,
-    DomainVerifyResponse, GlobalSettingsSchema,
+    DomainResponse, DomainCreateRequest, DomainVerifyResponse,
 )
+from app.schemas.serializers import site_to_dict, domain_to_dict
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter(prefix="/sites", tags=["sites"])
-
-
-def _page_to_response(page: Page) -> PageResponse:
-    """Convert Page ORM model to response schema."""
-    return PageResponse(
-        id=str(page.id),
-        siteId=str(page.site_id),
-        title=page.title,
-        slug=page.slug,
-        blocks=[],
-        htmlContent=page.html_content,
-        seo=SeoSchema(
-            title=page.seo_title or "",
-            description=page.seo_description or "",
-            keywords=page.seo_keywords,
-            ogImage=page.seo_og_image,
-            canonicalUrl=page.seo_canonical_url,
-            noIndex=page.seo_no_index,
-        ),
-        status=page.status,
-        isMain=page.is_main,
-        isHomePage=page.is_home_page,
-        createdAt=page.created_at.isoformat() + "Z",
-        updatedAt=page.updated_at.isoformat() + "Z",
-    )
-
-
-def _domain_to_response(domain: Domain) -> DomainResponse:
-    """Convert Domain ORM model to response schema."""
-    return DomainResponse(
-        id=str(domain.id),
-        siteId=str(domain.site_id),
-        domainName=domain.domain_name,
-        sslStatus=domain.ssl_status,
-        isPrimary=domain.is_primary,
-        isVerified=domain.is_verified,
-        createdAt=domain.created_at.isoformat() + "Z" if domain.created_at else None,
-    )
-
-
-def _site_to_response(site: Site) -> SiteResponse:
-    """Convert Site ORM model to response schema."""
-    gs = site.global_settings or {}
-    return SiteResponse(
-        id=str(site.id),
-        userId=site.user_id,
-        name=site.name,
-        description=site.description,
-        subdomain=site.subdomain,
-        favicon=site.favicon,
-        isPublished=site.is_published,
-        isImported=site.is_imported,
-        globalSettings=GlobalSettingsSchema(**gs) if gs else GlobalSettingsSchema(),
-        domains=[_domain_to_response(d) for d in (site.domains or [])],
-        pages=[_page_to_response(p) for p in (site.pages or [])],
-        status=site.status,
-        createdAt=site.created_at.isoformat() + "Z",
-        updatedAt=site.updated_at.isoformat() + "Z",
-    )
+# Site/domain routes return ORJSONResponse(dict) directly — see app/schemas/serializers.py
+router = APIRouter(prefix="/sites", tags=["sites"], default_response_class=ORJSONResponse)
 
 
 @router.get("", response_model=List[SiteResponse])
@@ -106,7 +51,7 @@ async def list_sites(
         .order_by(Site.updated_at.desc())
     )
     sites = result.scalars().all()
-    return [_site_to_response(s) for s in sites]
+    return ORJSONResponse([site_to_dict(s) for s in sites])
 
 
 @router.get("/{site_id}", response_model=SiteResponse)
@@ -114,17 +59,32 @@ async def get_site(
     site_id: str,
     user: CurrentUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
+    if_none_match: Optional[str] = Header(None),
 ):
-    """Get a single site by ID."""
-    result = await db.execute(
-        select(Site)
-        .where(Site.id == uuid.UUID(site_id), Site.user_id == user.user_id)
-        .options(selectinload(Site.pages), selectinload(Site.domains))
-    )
-    site = result.scalar_one_or_none()
-    if not site:
-        raise HTTPException(status_code=404, detail="Site not found")
-    return _site_to_response(site)
+    """
+    Get a single site by ID.
+    Served from the Redis site cache when possible; supports If-None-Match -> 304.
+    """
+    site_key = str(uuid.UUID(site_id))
+    gen, cached = await site_cache.lookup(site_key, user.user_id)
+    if cached:
+        etag, body = cached
+    else:
+        result = await db.execute(
+            select(Site)
+            .where(Site.id == uuid.UUID(site_id), Site.user_id == user.user_id)
+            .options(selectinload(Site.pages), selectinload(Site.domains))
+        )
+        site = result.scalar_one_or_none()
+        if not site:
+            raise HTTPException(status_code=404, detail="Site not found")
+        body = orjson.dumps(site_to_dict(site))
+        etag = await site_cache.store(site_key, user.user_id, gen, body)
+
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if site_cache.etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
 
 
 @router.post("", response_model=SiteResponse, status_code=201)
@@ -167,13 +127,14 @@ async def create_site(
 
     # Reload with relationships
     await db.refresh(site, attribute_names=["pages", "domains"])
-    return _site_to_response(site)
+    return ORJSONResponse(site_to_dict(site), status_code=201)
 
 
 @router.patch("/{site_id}", response_model=SiteResponse)
 async def update_site(
     site_id: str,
     data: SiteUpdateRequest,
+    background_tasks: BackgroundTasks,
     user: CurrentUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
@@ -242,25 +203,35 @@ async def update_site(
             detail="Database integrity error",
         ) from exc
     await db.refresh(site, attribute_names=["pages", "domains"])
-    return _site_to_response(site)
+    background_tasks.add_task(site_cache.invalidate, str(site.id))
+    return ORJSONResponse(site_to_dict(site))
 
 
 @router.delete("/{site_id}", status_code=204)
 async def delete_site(
     site_id: str,
+    background_tasks: BackgroundTasks,
     user: CurrentUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
-    """Delete a site and all its pages."""
+    """Delete a site and all its pages. Blocks, published files and SSL configs are cleaned up in the background."""
     result = await db.execute(
-        select(Site).where(Site.id == uuid.UUID(site_id), Site.user_id == user.user_id)
+        select(Site)
+        .where(Site.id == uuid.UUID(site_id), Site.user_id == user.user_id)
+        .options(selectinload(Site.pages), selectinload(Site.domains))
     )
     site = result.scalar_one_or_none()
     if not site:
         raise HTTPException(status_code=404, detail="Site not found")
 
+    page_ids = [str(p.id) for p in site.pages]
+    domain_names = [d.domain_name for d in site.domains]
     await db.delete(site)
 
+    from app.tasks.cleanup import cleanup_site_task
+    background_tasks.add_task(cleanup_site_task, str(site.id), page_ids, domain_names)
+    background_tasks.add_task(site_cache.invalidate, str(site.id))
+
 
 @router.post("/{site_id}/publish")
 async def publish_site(
@@ -300,6 +271,7 @@ async def publish_site(
     ]
     from app.tasks.publish import publish_site_task
     background_tasks.add_task(publish_site_task, str(site.id), site.name, pages_data, site.favicon or "")
+    background_tasks.add_task(site_cache.invalidate, str(site.id))
     logger.info(
         f"PUBLISH TRIGGERED: site_id={site.id} name='{site.name}' "
         f"pages={len(pages_data)} user={user.user_id}"
@@ -333,13 +305,14 @@ async def list_domains(
 ):
     """List all domains for a site."""
     site = await _get_site_for_user(site_id, user, db)
-    return [_domain_to_response(d) for d in site.domains]
+    return ORJSONResponse([domain_to_dict(d) for d in site.domains])
 
 
 @router.post("/{site_id}/domains", response_model=DomainResponse, status_code=201)
 async def add_domain(
     site_id: str,
     data: DomainCreateRequest,
+    background_tasks: BackgroundTasks,
     user: CurrentUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
@@ -370,13 +343,15 @@ async def add_domain(
     db.add(domain)
     await db.flush()
     await db.refresh(domain)
-    return _domain_to_response(domain)
+    background_tasks.add_task(site_cache.invalidate, str(site.id))
+    return ORJSONResponse(domain_to_dict(domain), status_code=201)
 
 
 @router.delete("/{site_id}/domains/{domain_id}", status_code=204)
 async def remove_domain(
     site_id: str,
     domain_id: str,
+    background_tasks: BackgroundTasks,
     user: CurrentUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
@@ -393,11 +368,16 @@ async def remove_domain(
         raise HTTPException(status_code=404, detail="Domain not found")
     await db.delete(domain)
 
+    from app.tasks.cleanup import cleanup_domains_task
+    background_tasks.add_task(cleanup_domains_task, [domain.domain_name])
+    background_tasks.add_task(site_cache.invalidate, str(site.id))
+
 
 @router.post("/{site_id}/domains/{domain_id}/verify", response_model=DomainVerifyResponse)
 async def verify_domain(
     site_id: str,
     domain_id: str,
+    background_tasks: BackgroundTasks,
     user: CurrentUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
@@ -437,6 +417,7 @@ async def verify_domain(
     # Update DB
     domain.is_verified = is_verified
     await db.flush()
+    background_tasks.add_task(site_cache.invalidate, str(site.id))
 
     if is_verified:
         message = f"Domain '{domain.domain_name}' is correctly pointing to {expected_ip}"
@@ -464,6 +445,7 @@ async def verify_domain(
 async def enable_ssl(
     site_id: str,
     domain_id: str,
+    background_tasks: BackgroundTasks,
     user: CurrentUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
@@ -493,6 +475,7 @@ async def enable_ssl(
     # Mark as pending
     domain.ssl_status = "pending"
     await db.flush()
+    background_tasks.add_task(site_cache.invalidate, str(site.id))
 
     # Run certbot in a subprocess
     loop = asyncio.get_event_loop()
@@ -581,6 +564,10 @@ def _run_certbot(domain_name: str) -> dict:
 
 # Directory for generated nginx SSL configs (shared volume with nginx)
 NGINX_SSL_CONF_DIR = "/etc/nginx/ssl-sites"
+# Stamped into every config _setup_nginx_ssl writes. setup-domain.sh puts the
+# builder domain's own config into the same directory, so cleanup only ever
+# deletes files carrying this marker (app/tasks/cleanup.py)
+NGINX_SSL_CONF_MARKER = "# Managed by the site builder API - removed with its domain"
 
 
 async def _setup_nginx_ssl(domain_name: str, site_id: str):
@@ -588,6 +575,7 @@ async def _setup_nginx_ssl(domain_name: str, site_id: str):
     os.makedirs(NGINX_SSL_CONF_DIR, exist_ok=True)
 
     conf_content = f"""# Auto-generated SSL config for {domain_name}
+{NGINX_SSL_CONF_MARKER}
 # Serves published site content for site_id: {site_id}
 server {{
     listen 443 ssl;
@@ -608,16 +596,25 @@ server {{
         try_files $uri $uri/ $uri.html $uri/index.html =404;
     }}
 
-    # Proxy to API backend (for forms, analytics, etc.)
-    location /api/ {{
+    # Proxy to API backend (for forms, analytics, uploads, etc.)
+    # ^~ so that image URLs under /api/ are not caught by the static assets regex
+    location ^~ /api/ {{
         proxy_pass http://api_backend;
         proxy_set_header Host $host;
         proxy_set_header X-Real-IP $remote_addr;
         proxy_set_header X-Forwarded-For $proxy_add_x_forwarded_for;
         proxy_set_header X-Forwarded-Proto https;
+        # This server has the /_uploads/ location below (app/core/file_response.py)
+        proxy_set_header X-Accel-Uploads on;
         proxy_read_timeout 120s;
     }}
 
+    # Upload bodies handed off by the API (X-Accel-Redirect)
+    location ^~ /_uploads/ {{
+        internal;
+        alias /app/uploads/;
+    }}
+
     # Uploaded files (images, media used by the published site)
     location /uploads/ {{
         alias /app/uploads/;
@@ -658,21 +655,13 @@ server {{
 
 async def _reload_nginx():
     """Reload nginx by sending HUP signal via docker socket API."""
-    docker_sock = "/var/run/docker.sock"
-    if not os.path.exists(docker_sock):
+    if not os.path.exists(settings.DOCKER_SOCKET):
         logger.warning("SSL: docker.sock not available, cannot reload nginx")
         return
 
     try:
         # Send SIGHUP to nginx container to reload config
-        proc = await asyncio.create_subprocess_exec(
-            "curl", "-s", "-X", "POST",
-            "--unix-socket", docker_sock,
-            "http://localhost/containers/sb-nginx/kill?signal=HUP",
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
-        )
-        stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout=10)
-        logger.info(f"SSL: Nginx reload signal sent (exit={proc.returncode})")
-    except Exception as e:
-        logger.error(f"SSL: Failed to reload nginx: {e}")
+        await kill_container("sb-nginx", signal="HUP")
+        logger.info("SSL: Nginx reload signal sent")
+    except HTTPException as e:
+        logger.error(f"SSL: Failed to reload nginx: {e.detail}")
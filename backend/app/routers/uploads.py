@@ -2,60 +2,517 @@
 File upload router — handles image and other file uploads.
 Files are stored on local disk and served via /api/v1/uploads/{user_id}/{filename}.
 For cloud storage use the external API at https://app.akm-advisor.com/api/v1/files/upload.
+
+Uploads are copied to disk in chunks (never held in memory as a whole), hashed
+and size-checked while streaming, and moved into place with an atomic rename.
+Files are stored content-addressed and deduplicated (see app/core/upload_store.py);
+their names are `<sha256><ext>`, so the URLs can be cached as immutable.
+
+Several files can be sent in one multipart request to POST /uploads:batch;
+they are written concurrently and get one result (or error) each, in order.
+Upload requests must declare their Content-Length (at most MAX_UPLOAD_SIZE,
+or UPLOAD_BATCH_MAX_BYTES for a batch), which is checked after authentication
+and before any of the body is read.
+
+Large files can be uploaded resumably (app/core/upload_sessions.py):
+    POST   /uploads/sessions          {filename, size} -> {id, offset: 0, ...}
+    GET    /uploads/sessions/{id}     current offset (after a dropped connection)
+    PATCH  /uploads/sessions/{id}     raw bytes, header Upload-Offset = current offset
+    DELETE /uploads/sessions/{id}     abort
+The PATCH that completes the declared size returns the same result as POST /uploads;
+repeating it (a retry after a lost response) returns that result again.
+
+New images get resized WebP/AVIF variants on the Celery worker
+(app/tasks/images.py), served from /uploads/variants/{sha256}/{name}.
+Other sizes are rendered on demand with ?w=&h=&fmt= and cached on disk
+(app/core/image_resize.py).
+
+Files are served with ETag/Last-Modified, 304 and Range support, or handed
+off to nginx with X-Accel-Redirect (app/core/file_response.py).
 """
 
+import asyncio
+import fcntl
+import hashlib
 import os
 import uuid
 import logging
+from typing import Dict, List, Optional, Tuple
 
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException
-from fastapi.responses import FileResponse
+import aiofiles
+import aiofiles.os
+import orjson
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Header, Query, Request
+from starlette.datastructures import UploadFile
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from sqlalchemy import Text, cast, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.requests import ClientDisconnect
 
+from app.celery_app import celery_app
 from app.core import settings
 from app.core.auth import get_current_user, CurrentUser
+from app.core.database import get_db
+from app.core.mongodb import get_mongo
+from app.core.file_response import file_response
+from app.core import image_resize, image_variants, upload_sessions, upload_store
+from app.models import Page, Site
+from app.schemas import UploadSessionCreateRequest
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/uploads", tags=["uploads"])
 
+CHUNK_SIZE = 1024 * 1024  # 1 MB
+# Allowance for multipart boundaries and part headers in Content-Length
+MULTIPART_OVERHEAD = 64 * 1024
+TMP_DIR_NAME = ".tmp"
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+# ── Helpers ───────────────────────────────────────────────────────────────────
+
+async def _stream_to_tmp(file: UploadFile) -> Tuple[str, int, str]:
+    """
+    Copy an upload to a temp file under UPLOAD_DIR chunk by chunk.
+    Returns (tmp_path, size, sha256 hex). Raises 413 as soon as the size limit is passed.
+    """
+    tmp_dir = os.path.join(settings.UPLOAD_DIR, TMP_DIR_NAME)
+    await aiofiles.os.makedirs(tmp_dir, exist_ok=True)
+    tmp_path = os.path.join(tmp_dir, f"{uuid.uuid4().hex}.part")
+
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        async with aiofiles.open(tmp_path, "wb") as out:
+            while chunk := await file.read(CHUNK_SIZE):
+                size += len(chunk)
+                if size > settings.MAX_UPLOAD_SIZE:
+                    raise HTTPException(status_code=413, detail="File too large")
+                # hashlib releases the GIL for large buffers
+                await asyncio.to_thread(digest.update, chunk)
+                await out.write(chunk)
+    except BaseException:
+        await _remove_quietly(tmp_path)
+        raise
+    return tmp_path, size, digest.hexdigest()
+
+
+async def _remove_quietly(path: str):
+    try:
+        await aiofiles.os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+async def _store_upload(
+    tmp_path: str, sha256: str, ext: str, size: int, user_id: str, background_tasks: BackgroundTasks,
+) -> dict:
+    """
+    Move a fully written temp file into the store; returns the upload response.
+    New images get their variants queued once the response is sent.
+    """
+    try:
+        created = await asyncio.to_thread(upload_store.store, tmp_path, sha256, ext, user_id)
+    except BaseException:
+        await _remove_quietly(tmp_path)
+        raise
+
+    if created and image_variants.is_image(ext):
+        background_tasks.add_task(_enqueue_variants, sha256, ext)
+
+    filename = upload_store.content_name(sha256, ext)
+    return {
+        "url": f"/api/v1/uploads/{user_id}/{filename}",
+        "filename": filename,
+        "size": size,
+        "sha256": sha256,
+        "deduplicated": not created,
+        "storage": "local",
+    }
+
+
+def _enqueue_variants(sha256: str, ext: str):
+    """Queue variant generation (by name — the API does not import the worker's task modules)."""
+    try:
+        celery_app.send_task("app.tasks.images.generate_image_variants", args=[sha256, ext], retry=False)
+    except Exception as e:
+        # The original is served either way; the publish renderer falls back to it
+        logger.warning(f"UPLOADS: could not queue image variants for {sha256}{ext}: {e}")
+
+
+def _cache_control(filename: str) -> str:
+    if upload_store.parse_content_name(filename):
+        return IMMUTABLE_CACHE_CONTROL  # name is the content hash
+    return f"public, max-age={settings.UPLOAD_CACHE_MAX_AGE}"
+
+
+async def _save_upload(file: UploadFile, user_id: str, background_tasks: BackgroundTasks) -> dict:
+    if not file.filename:
+        raise HTTPException(status_code=400, detail="No filename provided")
+
+    ext = upload_store.safe_ext(file.filename)
+
+    # Stream to a temp file, then move it into the content-addressed store
+    tmp_path, size, sha256 = await _stream_to_tmp(file)
+    return await _store_upload(tmp_path, sha256, ext, size, user_id, background_tasks)
+
+
+async def _save_batch(files: List[UploadFile], user_id: str, background_tasks: BackgroundTasks) -> dict:
+    """Save the files of a batch concurrently; one result or error per file, in order."""
+    slots = asyncio.Semaphore(settings.UPLOAD_BATCH_CONCURRENCY)
+
+    async def save(file: UploadFile) -> dict:
+        async with slots:
+            try:
+                result = await _save_upload(file, user_id, background_tasks)
+            except HTTPException as e:
+                return {"name": file.filename, "status": e.status_code, "error": e.detail}
+            except Exception as e:
+                logger.error(f"UPLOADS: batch upload of '{file.filename}' failed: {e}", exc_info=True)
+                return {"name": file.filename, "status": 500, "error": "Upload failed"}
+        return {"name": file.filename, "status": 200, **result}
+
+    results = await asyncio.gather(*(save(file) for file in files))
+    failed = sum(1 for r in results if r["status"] != 200)
+    return {"uploaded": len(results) - failed, "failed": failed, "results": results}
+
+
+async def _references(
+    url: str, user_id: str, db: AsyncSession, mongo: AsyncIOMotorDatabase,
+) -> List[str]:
+    """
+    Names of the user's sites and pages that use url: site favicon or global
+    settings, page html_content (imported pages) or og:image in PostgreSQL,
+    block content or settings in MongoDB.
+    """
+    result = await db.execute(
+        select(
+            Site.name, Site.favicon, cast(Site.global_settings, Text),
+            Page.id, Page.title, Page.html_content, Page.seo_og_image,
+        )
+        .select_from(Site)
+        .outerjoin(Page, Page.site_id == Site.id)
+        .where(Site.user_id == user_id)
+    )
+    titles: Dict[str, str] = {}
+    for site_name, favicon, global_settings, page_id, title, html_content, og_image in result.all():
+        if url in (favicon or "") or url in (global_settings or ""):
+            return [f"site '{site_name}'"]  # one is enough to refuse; skip the block scan
+        if page_id is None:
+            continue
+        if url in (html_content or "") or url in (og_image or ""):
+            return [f"page '{title}'"]
+        titles[str(page_id)] = title
+    if not titles:
+        return []
+
+    using = set()
+    cursor = mongo.blocks.find(
+        {"page_id": {"$in": list(titles)}}, {"_id": 0, "page_id": 1, "content": 1, "settings": 1},
+    )
+    async for block in cursor:
+        if block["page_id"] not in using and url.encode() in orjson.dumps(block):
+            using.add(block["page_id"])
+    return [f"page '{titles[page_id]}'" for page_id in using]
+
+
+def _check_content_length(content_length: Optional[str], limit: int, detail: str = "File too large"):
+    """
+    Upload requests must declare their size (411 otherwise), at most `limit`
+    bytes (413). Called before the multipart body is read: the upload routes
+    parse their form themselves instead of declaring File parameters, which
+    FastAPI would read and spool to disk before auth or this check ran.
+    """
+    if content_length is None:
+        raise HTTPException(status_code=411, detail="Content-Length required")
+    try:
+        length = int(content_length)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid Content-Length")
+    if length > limit:
+        raise HTTPException(status_code=413, detail=detail)
+
+
+def _multipart_body(field: str, schema: dict) -> dict:
+    """OpenAPI request body of an upload route that parses its form itself."""
+    return {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {"type": "object", "properties": {field: schema}, "required": [field]},
+            },
+        },
+    }
+
+
+_FILE_SCHEMA = {"type": "string", "format": "binary"}
+
 
 # ── Endpoints ─────────────────────────────────────────────────────────────────
 
-@router.post("")
+@router.post("", openapi_extra={"requestBody": _multipart_body("file", _FILE_SCHEMA)})
 async def upload_file(
-    file: UploadFile = File(...),
+    request: Request,
+    background_tasks: BackgroundTasks,
     user: CurrentUser = Depends(get_current_user),
 ):
     """
-    Upload a file to local disk storage.
+    Upload a file (multipart field `file`) to local disk storage.
     Returns a URL path that can be used to retrieve the file.
     For S3/cloud storage, the frontend should call the external API directly.
     """
-    if not file.filename:
-        raise HTTPException(status_code=400, detail="No filename provided")
+    _check_content_length(request.headers.get("content-length"), settings.MAX_UPLOAD_SIZE + MULTIPART_OVERHEAD)
+    async with request.form(max_files=1) as form:
+        file = form.get("file")
+        if not isinstance(file, UploadFile):
+            raise HTTPException(status_code=400, detail="No file provided")
+        return await _save_upload(file, user.user_id, background_tasks)
 
-    content = await file.read()
-    if len(content) > settings.MAX_UPLOAD_SIZE:
+
+@router.post(":batch", openapi_extra={"requestBody": _multipart_body("files", {"type": "array", "items": _FILE_SCHEMA})})
+async def upload_files_batch(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    user: CurrentUser = Depends(get_current_user),
+):
+    """
+    Upload several files (multipart field `files`, repeated) in one request.
+    Files are written to storage concurrently, at most UPLOAD_BATCH_CONCURRENCY
+    at a time. Returns one entry per file, in request order: the POST /uploads
+    result plus `name` and `status`, or `status` and `error` for failed files —
+    one failure does not fail the batch.
+
+    Content-Length is required and capped at UPLOAD_BATCH_MAX_BYTES.
+    """
+    _check_content_length(request.headers.get("content-length"), settings.UPLOAD_BATCH_MAX_BYTES, "Batch too large")
+    async with request.form(max_files=settings.UPLOAD_BATCH_MAX_FILES) as form:
+        files = [f for f in form.getlist("files") if isinstance(f, UploadFile)]
+        if not files:
+            raise HTTPException(status_code=400, detail="No files provided")
+        return await _save_batch(files, user.user_id, background_tasks)
+
+
+# ── Resumable uploads ─────────────────────────────────────────────────────────
+
+def _session_response(meta: dict) -> dict:
+    return {
+        "id": meta["id"],
+        "filename": meta["filename"],
+        "size": meta["size"],
+        "offset": meta["offset"],
+        "expiresAt": meta["expiresAt"],
+    }
+
+
+async def _get_session(session_id: str, user: CurrentUser) -> dict:
+    meta = await asyncio.to_thread(upload_sessions.load, session_id)
+    if meta is None or meta["userId"] != user.user_id:
+        raise HTTPException(status_code=404, detail="Upload session not found or expired")
+    return meta
+
+
+async def _completed_session(session_id: str, user: CurrentUser) -> dict:
+    """Stored result of a session completed by a concurrent request, else 404."""
+    meta = await _get_session(session_id, user)
+    if "result" not in meta:
+        raise HTTPException(status_code=404, detail="Upload session not found or expired")
+    return meta["result"]
+
+
+@router.post("/sessions", status_code=201)
+async def create_upload_session(
+    data: UploadSessionCreateRequest,
+    user: CurrentUser = Depends(get_current_user),
+):
+    """Start a resumable upload of `size` bytes."""
+    if data.size > settings.MAX_UPLOAD_SIZE:
         raise HTTPException(status_code=413, detail="File too large")
 
-    ext = os.path.splitext(file.filename)[1].lower()
-    unique_name = f"{uuid.uuid4().hex}{ext}"
+    await asyncio.to_thread(upload_sessions.sweep)
+    meta = await asyncio.to_thread(
+        upload_sessions.create, user.user_id, data.filename, upload_store.safe_ext(data.filename), data.size,
+    )
+    return _session_response({**meta, "offset": 0})
+
+
+@router.get("/sessions/{session_id}")
+async def get_upload_session(
+    session_id: str,
+    user: CurrentUser = Depends(get_current_user),
+):
+    """Current offset of a resumable upload — resume by sending bytes from there."""
+    meta = await _get_session(session_id, user)
+    return _session_response(meta)
+
+
+@router.patch("/sessions/{session_id}")
+async def append_upload_session(
+    session_id: str,
+    request: Request,
+    background_tasks: BackgroundTasks,
+    upload_offset: int = Header(..., alias="Upload-Offset"),
+    user: CurrentUser = Depends(get_current_user),
+):
+    """
+    Append the request body at Upload-Offset (must equal the current offset).
+    Bytes received before a dropped connection are kept. Completes the upload
+    when the declared size is reached.
+    """
+    meta = await _get_session(session_id, user)
+    if "result" in meta:
+        return meta["result"]  # retried final chunk of a completed upload
+    path = upload_sessions.part_path(session_id)
+
+    try:
+        # r+b, not ab: never re-create a .part that was already moved into the store
+        out = await aiofiles.open(path, "r+b")
+    except FileNotFoundError:
+        return await _completed_session(session_id, user)
+    try:
+        try:
+            # One writer per session, across workers; held until the upload is stored
+            fcntl.flock(out.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise HTTPException(status_code=409, detail="Another request is writing to this upload")
+
+        # The previous lock holder may have completed the upload meanwhile
+        meta = await _get_session(session_id, user)
+        if "result" in meta:
+            return meta["result"]
 
-    # Save to local disk
-    user_dir = os.path.join(settings.UPLOAD_DIR, user.user_id)
-    os.makedirs(user_dir, exist_ok=True)
-    filepath = os.path.join(user_dir, unique_name)
-    with open(filepath, "wb") as f:
-        f.write(content)
+        offset = await out.seek(0, os.SEEK_END)
+        if upload_offset != offset:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Upload-Offset mismatch, current offset is {offset}",
+                headers={"Upload-Offset": str(offset)},
+            )
 
-    url = f"/api/v1/uploads/{user.user_id}/{unique_name}"
-    return {"url": url, "filename": unique_name, "size": len(content), "storage": "local"}
+        try:
+            async for chunk in request.stream():
+                if offset + len(chunk) > meta["size"]:
+                    await out.truncate(upload_offset)
+                    raise HTTPException(status_code=413, detail="More data than the declared size")
+                await out.write(chunk)
+                offset += len(chunk)
+        except ClientDisconnect:
+            logger.info(f"UPLOADS: session {session_id} interrupted at {offset} bytes")
+        await out.flush()
+
+        if offset < meta["size"]:
+            await asyncio.to_thread(upload_sessions.touch, meta)
+            return _session_response({**meta, "offset": offset})
+
+        # Complete, still under the lock: hash (streamed from disk), move into
+        # the store and record the result before any other request can write
+        sha256 = await asyncio.to_thread(upload_sessions.hash_file, path)
+        result = await _store_upload(path, sha256, meta["ext"], offset, user.user_id, background_tasks)
+        await asyncio.to_thread(upload_sessions.complete, meta, result)
+        return result
+    finally:
+        await out.close()
+
+
+@router.delete("/sessions/{session_id}")
+async def abort_upload_session(
+    session_id: str,
+    user: CurrentUser = Depends(get_current_user),
+):
+    """Abort a resumable upload and discard the received bytes."""
+    await _get_session(session_id, user)
+    await asyncio.to_thread(upload_sessions.remove, session_id)
+    return {"deleted": True}
+
+
+@router.delete("/{filename}")
+async def delete_uploaded_file(
+    filename: str,
+    user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    mongo: AsyncIOMotorDatabase = Depends(get_mongo),
+):
+    """
+    Delete a file from the current user's upload library. Refused (409) while
+    any of the user's sites or pages still uses its URL: the user holds a
+    single reference per file, so deleting it would break all of them.
+    Shared content is kept on disk until the last user referencing it deletes it.
+    """
+    if filename.startswith(".") or os.path.basename(filename) != filename:
+        raise HTTPException(status_code=400, detail="Invalid filename")
+    if not await aiofiles.os.path.exists(upload_store.user_path(user.user_id, filename)):
+        raise HTTPException(status_code=404, detail="File not found")
+
+    used_by = await _references(f"/api/v1/uploads/{user.user_id}/{filename}", user.user_id, db, mongo)
+    if used_by:
+        raise HTTPException(
+            status_code=409,
+            detail=f"File is still used by {', '.join(used_by[:5])}. Remove it there first.",
+        )
+
+    if not await asyncio.to_thread(upload_store.release, user.user_id, filename):
+        raise HTTPException(status_code=404, detail="File not found")
+    return {"deleted": True}
+
+
+@router.get("/variants/{sha256}/{name}")
+async def get_image_variant(sha256: str, name: str, request: Request):
+    """Serve a resized variant of an uploaded image (see app/core/image_variants.py)."""
+    path = None
+    if upload_store.parse_content_name(sha256) == sha256:
+        path = image_variants.variant_path(sha256, name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Variant not found")
+    return await file_response(request, path, IMMUTABLE_CACHE_CONTROL)
+
+
+async def _resized_response(
+    request: Request,
+    filepath: str,
+    user_id: str,
+    filename: str,
+    w: Optional[int],
+    h: Optional[int],
+    fmt: Optional[str],
+):
+    fmt = fmt or "webp"
+    if not image_resize.can_encode(fmt):
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {fmt}")
+    if os.path.splitext(filename)[1].lower() not in image_resize.RESIZABLE_EXTS:
+        raise HTTPException(status_code=415, detail="File is not a resizable image")
+
+    sha256 = upload_store.parse_content_name(filename)
+    if sha256:
+        source_id = sha256  # shared by every user referencing the content
+    else:
+        st = await asyncio.to_thread(os.stat, filepath)
+        source_id = f"{user_id}/{filename}:{st.st_mtime_ns}:{st.st_size}"
+
+    path = await image_resize.resized(filepath, source_id, w, h, fmt)
+    return await file_response(request, path, _cache_control(filename), image_resize.FORMATS[fmt][1])
 
 
 @router.get("/{user_id}/{filename}")
-async def get_uploaded_file(user_id: str, filename: str):
-    """Serve a locally-stored uploaded file."""
-    filepath = os.path.join(settings.UPLOAD_DIR, user_id, filename)
-    if not os.path.exists(filepath):
+async def get_uploaded_file(
+    user_id: str,
+    filename: str,
+    request: Request,
+    w: Optional[int] = Query(None, ge=1, le=settings.IMAGE_RESIZE_MAX_DIMENSION, description="Max width"),
+    h: Optional[int] = Query(None, ge=1, le=settings.IMAGE_RESIZE_MAX_DIMENSION, description="Max height"),
+    fmt: Optional[str] = Query(None, description="webp (default when resizing), avif, jpeg or png"),
+):
+    """
+    Serve a locally-stored uploaded file. With w/h/fmt, images are served
+    resized to fit w x h (never upscaled), rendered once and cached; w and h
+    are rounded up to the allowed sizes (IMAGE_RESIZE_SIZES, IMAGE_VARIANT_WIDTHS).
+    """
+    # Hidden names are internal (.tmp, .cache) — and this also rules out ".."
+    if user_id.startswith(".") or filename.startswith("."):
         raise HTTPException(status_code=404, detail="File not found")
-    return FileResponse(filepath)
+    filepath = upload_store.user_path(user_id, filename)
+    if w or h or fmt:
+        if not await asyncio.to_thread(os.path.isfile, filepath):
+            raise HTTPException(status_code=404, detail="File not found")
+        return await _resized_response(request, filepath, user_id, filename, w, h, fmt)
+    return await file_response(request, filepath, _cache_control(filename))
@@ -80,6 +80,7 @@ class PageResponse(BaseModel):
     status: str = "draft"
     isMain: bool = False
     isHomePage: Optional[bool] = False
+    sortOrder: int = 0
     createdAt: str
     updatedAt: str
 
@@ -99,6 +100,33 @@ class PageUpdateRequest(BaseModel):
     htmlContent: Optional[str] = None
 
 
+class PageBulkCreateItem(BaseModel):
+    title: str
+    slug: Optional[str] = None
+    htmlContent: Optional[str] = None
+    isMain: Optional[bool] = False
+    isHomePage: Optional[bool] = False
+
+
+class PageBulkCreateRequest(BaseModel):
+    pages: List[PageBulkCreateItem] = Field(..., min_length=1, max_length=1000)
+
+
+class PageMoveSchema(BaseModel):
+    """Target position for a page: placed right after afterId (None = first)."""
+    afterId: Optional[str] = None
+
+
+class PageBatchItem(PageUpdateRequest):
+    """Single entry of a batch update — same fields as PATCH plus the page id."""
+    id: str
+    move: Optional[PageMoveSchema] = None
+
+
+class PageBatchUpdateRequest(BaseModel):
+    pages: List[PageBatchItem] = Field(..., min_length=1, max_length=500)
+
+
 # ========== Domains ==========
 
 class DomainCreateRequest(BaseModel):
@@ -178,6 +206,13 @@ class BlocksSaveRequest(BaseModel):
     blocks: List[BlockSchemaSave]  # uses raw dict for settings — preserves minHeight, etc.
 
 
+# ========== Uploads ==========
+
+class UploadSessionCreateRequest(BaseModel):
+    filename: str = Field(..., min_length=1, max_length=255)
+    size: int = Field(..., gt=0)  # total bytes the client will send
+
+
 # ========== Health ==========
 
 class HealthResponse(BaseModel):
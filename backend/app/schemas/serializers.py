@@ -0,0 +1,80 @@
+"""
+Direct ORM -> dict serializers for the hot site/page/block endpoints.
+
+Output matches SiteResponse / PageResponse / DomainResponse exactly, but skips
+building Pydantic objects per row. Routes return these dicts wrapped in
+ORJSONResponse, which bypasses response_model validation; the schemas are
+still declared on the routes for OpenAPI.
+"""
+
+from typing import Any, Dict
+
+from app.models import Site, Page, Domain
+from app.schemas import GlobalSettingsSchema
+
+_GLOBAL_SETTINGS_FIELDS = tuple(GlobalSettingsSchema.model_fields)
+
+
+def _iso(value) -> str:
+    return value.isoformat() + "Z"
+
+
+def page_to_dict(page: Page) -> Dict[str, Any]:
+    """Serialize a Page row in PageResponse shape."""
+    return {
+        "id": str(page.id),
+        "siteId": str(page.site_id),
+        "title": page.title,
+        "slug": page.slug,
+        "blocks": [],
+        "htmlContent": page.html_content,
+        "seo": {
+            "title": page.seo_title or "",
+            "description": page.seo_description or "",
+            "keywords": page.seo_keywords,
+            "ogImage": page.seo_og_image,
+            "canonicalUrl": page.seo_canonical_url,
+            "noIndex": page.seo_no_index,
+        },
+        "status": page.status,
+        "isMain": bool(page.is_main),
+        "isHomePage": page.is_home_page,
+        "sortOrder": page.sort_order or 0,
+        "createdAt": _iso(page.created_at),
+        "updatedAt": _iso(page.updated_at),
+    }
+
+
+def domain_to_dict(domain: Domain) -> Dict[str, Any]:
+    """Serialize a Domain row in DomainResponse shape."""
+    return {
+        "id": str(domain.id),
+        "siteId": str(domain.site_id),
+        "domain": None,
+        "domainName": domain.domain_name,
+        "sslStatus": domain.ssl_status,
+        "isPrimary": domain.is_primary,
+        "isVerified": domain.is_verified,
+        "createdAt": _iso(domain.created_at) if domain.created_at else None,
+    }
+
+
+def site_to_dict(site: Site) -> Dict[str, Any]:
+    """Serialize a Site row (with pages and domains loaded) in SiteResponse shape."""
+    gs = site.global_settings or {}
+    return {
+        "id": str(site.id),
+        "userId": site.user_id,
+        "name": site.name,
+        "description": site.description,
+        "subdomain": site.subdomain,
+        "favicon": site.favicon,
+        "isPublished": site.is_published,
+        "isImported": site.is_imported,
+        "globalSettings": {k: gs.get(k) for k in _GLOBAL_SETTINGS_FIELDS},
+        "domains": [domain_to_dict(d) for d in (site.domains or [])],
+        "pages": [page_to_dict(p) for p in (site.pages or [])],
+        "status": site.status,
+        "createdAt": _iso(site.created_at),
+        "updatedAt": _iso(site.updated_at),
+    }
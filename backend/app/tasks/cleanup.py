@@ -0,0 +1,214 @@
+"""
+Cleanup tasks - remove Mongo blocks, published output and nginx SSL configs
+that no longer belong to any site/page/domain in PostgreSQL.
+
+Deletes only touch PostgreSQL rows, so these tasks run afterwards:
+- targeted cleanup as a FastAPI BackgroundTask from the delete routes
+- full reconciliation (`python -m app.tasks.cleanup [--apply]`, see `make gc`)
+  which diffs PG ids against Mongo and the filesystem, with a dry-run report.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import shutil
+import time
+import uuid
+from typing import Iterable, List
+
+from pymongo import MongoClient
+from sqlalchemy import create_engine, select
+
+from app.core import settings
+from app.models import Site, Page, Domain
+from app.routers.sites import NGINX_SSL_CONF_DIR, NGINX_SSL_CONF_MARKER, _reload_nginx
+
+logger = logging.getLogger(__name__)
+
+# Configs written by _setup_nginx_ssl before NGINX_SSL_CONF_MARKER existed
+# carry this line, which the builder's own config (setup-domain.sh) does not
+_LEGACY_SSL_CONF_LINE = "# Serves published site content for site_id:"
+
+
+def _chunks(items: List[str], size: int) -> Iterable[List[str]]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _is_uuid(value: str) -> bool:
+    try:
+        uuid.UUID(value)
+        return True
+    except ValueError:
+        return False
+
+
+def _delete_blocks(mongo_db, page_ids: List[str]) -> int:
+    """Delete blocks of the given pages in rate-limited chunks. Returns deleted count."""
+    deleted = 0
+    for i, chunk in enumerate(_chunks(page_ids, settings.GC_BATCH_SIZE)):
+        if i:
+            time.sleep(settings.GC_BATCH_PAUSE)
+        result = mongo_db.blocks.delete_many({"page_id": {"$in": chunk}})
+        deleted += result.deleted_count
+    return deleted
+
+
+def _delete_published_dirs(site_ids: List[str]) -> None:
+    for i, chunk in enumerate(_chunks(site_ids, settings.GC_BATCH_SIZE)):
+        if i:
+            time.sleep(settings.GC_BATCH_PAUSE)
+        for site_id in chunk:
+            shutil.rmtree(os.path.join(settings.PUBLISH_DIR, site_id), ignore_errors=True)
+
+
+def _is_api_conf(conf_path: str) -> bool:
+    """True if the config was generated by the API (see NGINX_SSL_CONF_MARKER)."""
+    try:
+        with open(conf_path) as f:
+            head = f.read(1024)
+    except OSError:
+        return False
+    return NGINX_SSL_CONF_MARKER in head or _LEGACY_SSL_CONF_LINE in head
+
+
+def _delete_ssl_confs(domain_names: List[str]) -> int:
+    """
+    Remove API-generated nginx SSL configs and reload nginx once. Files without
+    the API marker are never deleted. Returns removed count.
+    """
+    removed = 0
+    for domain_name in domain_names:
+        conf_path = os.path.join(NGINX_SSL_CONF_DIR, f"{domain_name}.conf")
+        if not os.path.exists(conf_path):
+            continue
+        if not _is_api_conf(conf_path):
+            logger.warning(f"CLEANUP: keeping {conf_path}, not generated by the API")
+            continue
+        try:
+            os.remove(conf_path)
+            removed += 1
+        except FileNotFoundError:
+            continue
+        except OSError as exc:
+            logger.warning(f"CLEANUP: cannot remove {conf_path}: {exc}")
+    if removed:
+        asyncio.run(_reload_nginx())
+    return removed
+
+
+def cleanup_site_task(site_id: str, page_ids: List[str], domain_names: List[str]):
+    """
+    Remove everything left behind by a deleted site.
+    Called as a FastAPI BackgroundTask after the PG rows are committed.
+    """
+    try:
+        mongo_client = MongoClient(settings.mongo_url)
+        try:
+            blocks = _delete_blocks(mongo_client[settings.MONGO_DB], page_ids)
+        finally:
+            mongo_client.close()
+        _delete_published_dirs([site_id])
+        confs = _delete_ssl_confs(domain_names)
+        logger.info(
+            f"CLEANUP: site_id={site_id} pages={len(page_ids)} blocks={blocks} ssl_confs={confs}"
+        )
+    except Exception as exc:
+        logger.error(f"CLEANUP ERROR: site_id={site_id} error={exc}", exc_info=True)
+
+
+def cleanup_pages_task(page_ids: List[str]):
+    """Remove Mongo blocks of deleted pages. Called as a FastAPI BackgroundTask."""
+    try:
+        mongo_client = MongoClient(settings.mongo_url)
+        try:
+            blocks = _delete_blocks(mongo_client[settings.MONGO_DB], page_ids)
+        finally:
+            mongo_client.close()
+        logger.info(f"CLEANUP: pages={len(page_ids)} blocks={blocks}")
+    except Exception as exc:
+        logger.error(f"CLEANUP ERROR: pages={page_ids} error={exc}", exc_info=True)
+
+
+def cleanup_domains_task(domain_names: List[str]):
+    """Remove nginx SSL configs of deleted domains. Called as a FastAPI BackgroundTask."""
+    try:
+        confs = _delete_ssl_confs(domain_names)
+        logger.info(f"CLEANUP: domains={domain_names} ssl_confs={confs}")
+    except Exception as exc:
+        logger.error(f"CLEANUP ERROR: domains={domain_names} error={exc}", exc_info=True)
+
+
+def reconcile_orphans(dry_run: bool = True) -> dict:
+    """
+    Find and (unless dry_run) delete orphaned Mongo blocks, published site
+    directories and nginx SSL configs. Returns a report of what was found.
+
+    Mongo and the filesystem are listed BEFORE PostgreSQL so that a page or
+    site created while the job runs is never mistaken for an orphan.
+    """
+    started = time.time()
+    mongo_client = MongoClient(settings.mongo_url)
+    engine = create_engine(settings.postgres_sync_url)
+    try:
+        mongo_db = mongo_client[settings.MONGO_DB]
+
+        # 1. Snapshot Mongo and the filesystem
+        block_page_ids = set(mongo_db.blocks.distinct("page_id"))
+        published_ids = set()
+        if os.path.isdir(settings.PUBLISH_DIR):
+            published_ids = {
+                name for name in os.listdir(settings.PUBLISH_DIR)
+                if _is_uuid(name) and os.path.isdir(os.path.join(settings.PUBLISH_DIR, name))
+            }
+        conf_domains = set()
+        if os.path.isdir(NGINX_SSL_CONF_DIR):
+            conf_domains = {
+                name[:-len(".conf")] for name in os.listdir(NGINX_SSL_CONF_DIR)
+                if name.endswith(".conf") and _is_api_conf(os.path.join(NGINX_SSL_CONF_DIR, name))
+            }
+
+        # 2. Then read the live ids from PostgreSQL
+        with engine.connect() as conn:
+            page_ids = {str(v) for v in conn.scalars(select(Page.id))}
+            site_ids = {str(v) for v in conn.scalars(select(Site.id))}
+            domain_names = set(conn.scalars(select(Domain.domain_name)))
+
+        orphan_pages = sorted(block_page_ids - page_ids)
+        orphan_sites = sorted(published_ids - site_ids)
+        orphan_domains = sorted(conf_domains - domain_names)
+
+        report = {
+            "dryRun": dry_run,
+            "orphanBlockPages": len(orphan_pages),
+            "orphanPublishedSites": len(orphan_sites),
+            "orphanSslConfigs": len(orphan_domains),
+            "deletedBlocks": 0,
+            "samples": {
+                "blockPages": orphan_pages[:20],
+                "publishedSites": orphan_sites[:20],
+                "sslConfigs": orphan_domains[:20],
+            },
+        }
+
+        if not dry_run:
+            report["deletedBlocks"] = _delete_blocks(mongo_db, orphan_pages)
+            _delete_published_dirs(orphan_sites)
+            _delete_ssl_confs(orphan_domains)
+    finally:
+        mongo_client.close()
+        engine.dispose()
+
+    report["durationSec"] = round(time.time() - started, 2)
+    logger.info(f"CLEANUP RECONCILE: {report}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reconcile orphaned blocks, published files and SSL configs.")
+    parser.add_argument("--apply", action="store_true", help="Delete orphans (default is a dry-run report)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    print(json.dumps(reconcile_orphans(dry_run=not args.apply), indent=2))
@@ -0,0 +1,132 @@
+"""
+Image variant task - resized WebP (and optionally AVIF) versions of uploads.
+Runs on the Celery worker (app/celery_app.py); enqueued by the uploads router
+for every new image in the content-addressed store.
+
+Each configured width below the original width gets a variant, plus one at
+the original width when it is below the largest configured width (re-encoded
+as WebP it is still much smaller than a PNG/JPEG original). Images are never
+upscaled. The manifest (app/core/image_variants.py) also records the original
+dimensions and the dominant colour, which the publish renderer uses for
+width/height attributes and as a placeholder background.
+"""
+
+import logging
+import os
+from typing import Any, Dict, List
+
+from PIL import Image, ImageOps
+
+from app.celery_app import celery_app
+from app.core import image_variants, settings, upload_store
+
+try:
+    import pillow_avif  # noqa: F401 — registers the AVIF plugin on Pillow < 11.2
+except ImportError:
+    pass
+
+logger = logging.getLogger(__name__)
+
+# Decompression bomb guard: refuse images above this many pixels
+Image.MAX_IMAGE_PIXELS = 80_000_000
+
+
+def _avif_enabled() -> bool:
+    if not settings.IMAGE_VARIANT_AVIF:
+        return False
+    Image.init()
+    if "AVIF" not in Image.SAVE:
+        logger.warning("IMAGES: IMAGE_VARIANT_AVIF is enabled but Pillow cannot encode AVIF; WebP only")
+        return False
+    return True
+
+
+def _dominant_color(img: Image.Image) -> str:
+    """Most common colour of a small median-cut palette, as #rrggbb."""
+    small = img.convert("RGB")
+    small.thumbnail((64, 64))
+    palette_img = small.quantize(colors=5, method=Image.Quantize.MEDIANCUT)
+    _, index = max(palette_img.getcolors())
+    r, g, b = palette_img.getpalette()[index * 3:index * 3 + 3]
+    return f"#{r:02x}{g:02x}{b:02x}"
+
+
+def _target_widths(width: int) -> List[int]:
+    configured = image_variants.widths()
+    targets = [w for w in configured if w < width]
+    if configured and width < configured[-1]:
+        targets.append(width)
+    return targets
+
+
+def _save(img: Image.Image, path: str, fmt: str):
+    tmp = path + ".tmp"
+    if fmt == "webp":
+        img.save(tmp, "WEBP", quality=settings.IMAGE_VARIANT_QUALITY, method=4)
+    else:
+        img.save(tmp, "AVIF", quality=settings.IMAGE_VARIANT_QUALITY)
+    os.replace(tmp, path)
+
+
+def build_variants(sha256: str, ext: str) -> Dict[str, Any]:
+    """Generate the variants of a stored image and write its manifest. Returns the manifest."""
+    with Image.open(upload_store.blob_path(sha256, ext)) as source:
+        img = ImageOps.exif_transpose(source)  # phone photos: apply the EXIF rotation
+        img.load()
+    if img.mode not in ("RGB", "RGBA"):
+        has_alpha = img.mode in ("LA", "PA") or (img.mode == "P" and "transparency" in img.info)
+        img = img.convert("RGBA" if has_alpha else "RGB")
+
+    width, height = img.size
+    formats = ["webp"] + (["avif"] if _avif_enabled() else [])
+    out_dir = image_variants.variants_dir(sha256)
+    os.makedirs(out_dir, exist_ok=True)
+
+    variants = []
+    # Largest first, each resized from the previous one: cheaper than always
+    # resampling the full-size original, and LANCZOS keeps the quality
+    current = img
+    for target in sorted(_target_widths(width), reverse=True):
+        target_height = max(1, round(height * target / width))
+        if current.width != target:
+            current = current.resize((target, target_height), Image.LANCZOS, reducing_gap=3.0)
+        for fmt in formats:
+            name = image_variants.variant_name(target, fmt)
+            path = os.path.join(out_dir, name)
+            _save(current, path, fmt)
+            variants.append({
+                "name": name,
+                "format": fmt,
+                "width": target,
+                "height": target_height,
+                "size": os.path.getsize(path),
+            })
+
+    manifest = {
+        "width": width,
+        "height": height,
+        "color": _dominant_color(img),
+        "variants": sorted(variants, key=lambda v: (v["format"], v["width"])),
+    }
+    image_variants.write_manifest(sha256, manifest)
+    return manifest
+
+
+@celery_app.task(name="app.tasks.images.generate_image_variants", ignore_result=True)
+def generate_image_variants(sha256: str, ext: str):
+    """Celery task: build the variants of an uploaded image unless they exist."""
+    if image_variants.load_manifest(sha256) is not None:
+        return
+    if not os.path.exists(upload_store.blob_path(sha256, ext)):
+        return  # deleted before the task ran
+    try:
+        manifest = build_variants(sha256, ext)
+    except (OSError, Image.DecompressionBombError, ValueError) as exc:
+        # Not a decodable image (or too large) — the original is still served as is
+        logger.warning(f"IMAGES: no variants for {sha256}{ext}: {exc}")
+        image_variants.remove(sha256)
+        return
+    logger.info(
+        f"IMAGES: {sha256}{ext} {manifest['width']}x{manifest['height']} "
+        f"-> {len(manifest['variants'])} variants"
+    )
@@ -10,7 +10,7 @@ from datetime import datetime
 from pymongo import MongoClient
 from jinja2 import Environment, FileSystemLoader
 
-from app.core import settings
+from app.core import image_variants, settings
 
 logger = logging.getLogger(__name__)
 
@@ -139,6 +139,70 @@ def _sanitize_tilda_html(html: str) -> str:
     return html
 
 
+# Background images: the inline style carries the variant per viewport class as
+# custom properties, the page stylesheet (_RESPONSIVE_CSS) picks one per breakpoint
+_BG_BREAKPOINTS = (("--bg-md", 1024), ("--bg-sm", 480))
+_RESPONSIVE_CSS = "".join(
+    f'@media (max-width: {max_w}px) {{ [style*="{prop}"] {{ background-image: var({prop}) !important; }} }}'
+    for prop, max_w in _BG_BREAKPOINTS
+)
+# Headroom for device pixel ratio when choosing a variant for a viewport width
+_BG_DPR = 1.5
+
+
+def _webp_variants(manifest: dict) -> list:
+    return [v for v in manifest["variants"] if v["format"] == "webp"]
+
+
+def _responsive_img(url: str, alt: str, style: str, sizes: str) -> str:
+    """
+    <img> for an image URL. Uploads with generated variants become a <picture>
+    with AVIF/WebP srcsets, intrinsic width/height (no layout shift) and the
+    dominant colour as placeholder; the original stays the fallback src.
+    """
+    import html as html_lib
+
+    def esc(v) -> str:
+        return html_lib.escape(str(v)) if v else ""
+
+    manifest = image_variants.manifest_for_url(url)
+    if not manifest or not manifest["variants"]:
+        return f'<img src="{esc(url)}" alt="{esc(alt)}" style="{style}" />'
+
+    sha256 = manifest["sha256"]
+    sources = ""
+    for fmt in ("avif", "webp"):
+        srcset = ", ".join(
+            f'{image_variants.variant_url(sha256, v["name"])} {v["width"]}w'
+            for v in manifest["variants"] if v["format"] == fmt
+        )
+        if srcset:
+            sources += f'<source type="image/{fmt}" srcset="{srcset}" sizes="{sizes}" />'
+    return (
+        f'<picture>{sources}<img src="{esc(url)}" alt="{esc(alt)}" '
+        f'width="{manifest["width"]}" height="{manifest["height"]}" loading="lazy" decoding="async" '
+        f'style="{style};height:auto;background-color:{manifest["color"]};" /></picture>'
+    )
+
+
+def _background_css(url: str) -> str:
+    """CSS declarations for a background image, using WebP variants per breakpoint when available."""
+    import html as html_lib
+
+    manifest = image_variants.manifest_for_url(url)
+    webp = _webp_variants(manifest) if manifest else []
+    if not webp:
+        return f"background-image:url('{html_lib.escape(url)}');"
+
+    sha256 = manifest["sha256"]
+    css = f"background-image:url('{image_variants.variant_url(sha256, webp[-1]['name'])}');"
+    for prop, max_w in _BG_BREAKPOINTS:
+        fitting = [v for v in webp if v["width"] >= max_w * _BG_DPR]
+        variant = fitting[0] if fitting else webp[-1]
+        css += f"{prop}:url('{image_variants.variant_url(sha256, variant['name'])}');"
+    return css
+
+
 def _generate_fallback_html(title: str, site_name: str, blocks: list, favicon: str = "") -> str:
     """
     Generate styled static HTML from block data.
@@ -197,7 +261,7 @@ def _generate_fallback_html(title: str, site_name: str, blocks: list, favicon: s
         bg_img_section = settings.get("backgroundImage", "")
         section_style = f"background-color:{bg};padding:{pt} 0 {pb};"
         if bg_img_section:
-            section_style += f"background-image:url('{esc(bg_img_section)}');background-size:cover;background-position:center;"
+            section_style += f"{_background_css(bg_img_section)}background-size:cover;background-position:center;"
             if settings.get("parallax"):
                 section_style += "background-attachment:fixed;"
         if min_h:
@@ -222,7 +286,7 @@ def _generate_fallback_html(title: str, site_name: str, blocks: list, favicon: s
                 f"align-items:center;justify-content:center;text-align:center;"
             )
             if bg_img:
-                cover_style += f"background-image:url('{esc(bg_img)}');background-size:cover;background-position:center;"
+                cover_style += f"{_background_css(bg_img)}background-size:cover;background-position:center;"
                 if settings.get("parallax"):
                     cover_style += "background-attachment:fixed;"
             overlay_div = f'<div style="position:absolute;inset:0;background:rgba(0,0,0,{overlay});"></div>' if bg_img else ""
@@ -324,7 +388,7 @@ def _generate_fallback_html(title: str, site_name: str, blocks: list, favicon: s
             align = settings.get("align", "center")
             left_text = safe_html(content.get("leftText", ""))
             right_text = safe_html(content.get("rightText", ""))
-            img = esc(content.get("image", ""))
+            img = content.get("image", "")
             counters = content.get("counters", [])
             level = content.get("level", "h2")
 
@@ -344,7 +408,10 @@ def _generate_fallback_html(title: str, site_name: str, blocks: list, favicon: s
                 rt_style = f"color:#555;line-height:1.7;{_text_css(content, 'rightText', '16px')}"
                 body_parts.append(f'<div style="display:flex;gap:40px;text-align:left;"><div style="flex:1"><div style="{lt_style}">{left_text}</div></div><div style="flex:1"><div style="{rt_style}">{right_text}</div></div></div>')
             if img:
-                body_parts.append(f'<img src="{img}" style="max-width:100%;width:500px;border-radius:12px;" alt="" />')
+                body_parts.append(_responsive_img(
+                    img, "", "max-width:100%;width:500px;border-radius:12px",
+                    "(max-width: 580px) calc(100vw - 80px), 500px",
+                ))
             if counters:
                 ctrs = "".join(f'<div style="flex:1;min-width:120px;"><div style="font-size:2rem;font-weight:800;color:#1976d2;">{esc(c.get("value",""))}</div><div style="color:#888;font-size:14px;margin-top:4px;">{esc(c.get("label",""))}</div></div>' for c in counters)
                 body_parts.append(f'<div style="display:flex;flex-wrap:wrap;gap:20px;justify-content:center;margin-top:32px;">{ctrs}</div>')
@@ -352,16 +419,26 @@ def _generate_fallback_html(title: str, site_name: str, blocks: list, favicon: s
 
         # ── Image block ────────────────────────────────────────────────────
         elif block_type == "ImageBlock01":
-            img = esc(content.get("image", ""))
-            alt = esc(content.get("alt", ""))
+            img = content.get("image", "")
             caption = esc(content.get("caption", ""))
-            inner = f'<section style="{section_style}"><div style="max-width:1100px;margin:0 auto;padding:0 40px;text-align:center;">{"<img src=\'" + img + "\' alt=\'" + alt + "\' style=\'max-width:100%;border-radius:8px;\' />" if img else ""}{"<p style=\'color:#888;font-size:13px;margin-top:10px;\'>" + caption + "</p>" if caption else ""}</div></section>'
+            img_html = _responsive_img(
+                img, content.get("alt", ""), "max-width:100%;border-radius:8px",
+                "(max-width: 1100px) calc(100vw - 80px), 1020px",
+            ) if img else ""
+            inner = f'<section style="{section_style}"><div style="max-width:1100px;margin:0 auto;padding:0 40px;text-align:center;">{img_html}{"<p style=\'color:#888;font-size:13px;margin-top:10px;\'>" + caption + "</p>" if caption else ""}</div></section>'
 
         # ── Gallery block ──────────────────────────────────────────────────
         elif block_type == "GalleryBlock01":
             images = content.get("images", [])
             cols = int(content.get("columns", 2))
-            imgs_html = "".join(f'<img src="{esc(img.get("src",""))}" alt="{esc(img.get("alt",""))}" style="width:100%;aspect-ratio:4/3;object-fit:cover;border-radius:8px;" />' for img in images)
+            gallery_sizes = f"(max-width: 1100px) calc((100vw - 80px) / {cols}), {1020 // max(cols, 1)}px"
+            imgs_html = "".join(
+                _responsive_img(
+                    img.get("src", ""), img.get("alt", ""),
+                    "width:100%;aspect-ratio:4/3;object-fit:cover;border-radius:8px", gallery_sizes,
+                )
+                for img in images
+            )
             inner = f'<section style="{section_style}"><div style="max-width:1100px;margin:0 auto;padding:0 40px;"><div style="display:grid;grid-template-columns:repeat({cols},1fr);gap:16px;">{imgs_html}</div></div></section>'
 
         # ── Button block ───────────────────────────────────────────────────
@@ -451,6 +528,8 @@ def _generate_fallback_html(title: str, site_name: str, blocks: list, favicon: s
         * {{ margin: 0; padding: 0; box-sizing: border-box; }}
         body {{ font-family: 'Inter', -apple-system, BlinkMacSystemFont, 'Segoe UI', sans-serif; color: #212121; line-height: 1.5; }}
         img {{ display: block; }}
+        picture {{ display: contents; }}
+        {_RESPONSIVE_CSS}
         a {{ text-decoration: none; }}
         @media (max-width: 768px) {{
             nav div {{ flex-wrap: wrap; gap: 8px; }}
@@ -0,0 +1,130 @@
+"""
+Microbenchmark: list_sites serialization for a 100-site / 2,000-page account.
+
+Compares the previous path (Pydantic SiteResponse per row, FastAPI
+response_model validation + jsonable serialization, stdlib json) with the
+direct dict + orjson path used by the routers. No database needed.
+
+    cd backend && python -m benchmarks.bench_serialization
+"""
+
+import asyncio
+import json
+import time
+import uuid
+from datetime import datetime
+from typing import List
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.models import Site, Page, Domain
+from app.schemas import SiteResponse, PageResponse, SeoSchema, DomainResponse, GlobalSettingsSchema
+from app.schemas.serializers import site_to_dict
+
+SITES = 100
+PAGES_PER_SITE = 20
+ROUNDS = 5
+
+
+def _make_account() -> List[Site]:
+    now = datetime.utcnow()
+    sites = []
+    for s in range(SITES):
+        site = Site(
+            id=uuid.uuid4(), user_id="user-1", name=f"Site {s}", description="Benchmark site",
+            subdomain=f"site{s}", status="draft", is_published=False, is_imported=False,
+            global_settings={"fonts": {"heading": "Inter", "body": "Inter"}, "primaryColor": "#1976D2"},
+            created_at=now, updated_at=now,
+        )
+        site.domains = [Domain(
+            id=uuid.uuid4(), site_id=site.id, domain_name=f"site{s}.example.com",
+            ssl_status="none", is_primary=True, is_verified=False, created_at=now,
+        )]
+        site.pages = [
+            Page(
+                id=uuid.uuid4(), site_id=site.id, title=f"Page {p}", slug=f"page-{p}",
+                seo_title=f"Page {p}", seo_description="Description", seo_no_index=False,
+                status="draft", is_main=p == 0, is_home_page=p == 0, sort_order=(p + 1) * 1024,
+                created_at=now, updated_at=now,
+            )
+            for p in range(PAGES_PER_SITE)
+        ]
+        sites.append(site)
+    return sites
+
+
+def _legacy_site_to_response(site: Site) -> SiteResponse:
+    """The per-row Pydantic construction the routers used before serializers.py."""
+    gs = site.global_settings or {}
+    return SiteResponse(
+        id=str(site.id), userId=site.user_id, name=site.name, description=site.description,
+        subdomain=site.subdomain, favicon=site.favicon, isPublished=site.is_published,
+        isImported=site.is_imported,
+        globalSettings=GlobalSettingsSchema(**gs) if gs else GlobalSettingsSchema(),
+        domains=[
+            DomainResponse(
+                id=str(d.id), siteId=str(d.site_id), domainName=d.domain_name,
+                sslStatus=d.ssl_status, isPrimary=d.is_primary, isVerified=d.is_verified,
+                createdAt=d.created_at.isoformat() + "Z" if d.created_at else None,
+            )
+            for d in site.domains
+        ],
+        pages=[
+            PageResponse(
+                id=str(p.id), siteId=str(p.site_id), title=p.title, slug=p.slug, blocks=[],
+                htmlContent=p.html_content,
+                seo=SeoSchema(
+                    title=p.seo_title or "", description=p.seo_description or "",
+                    keywords=p.seo_keywords, ogImage=p.seo_og_image,
+                    canonicalUrl=p.seo_canonical_url, noIndex=p.seo_no_index,
+                ),
+                status=p.status, isMain=p.is_main, isHomePage=p.is_home_page,
+                sortOrder=p.sort_order or 0,
+                createdAt=p.created_at.isoformat() + "Z", updatedAt=p.updated_at.isoformat() + "Z",
+            )
+            for p in site.pages
+        ],
+        status=site.status, createdAt=site.created_at.isoformat() + "Z",
+        updatedAt=site.updated_at.isoformat() + "Z",
+    )
+
+
+async def _legacy(sites: List[Site], field) -> bytes:
+    content = [_legacy_site_to_response(s) for s in sites]
+    serialized = await serialize_response(field=field, response_content=content, is_coroutine=True)
+    return JSONResponse(serialized).body
+
+
+def _fast(sites: List[Site]) -> bytes:
+    return ORJSONResponse([site_to_dict(s) for s in sites]).body
+
+
+async def main():
+    sites = _make_account()
+    field = create_response_field(name="Response_list_sites", type_=List[SiteResponse])
+
+    legacy_body = await _legacy(sites, field)
+    fast_body = _fast(sites)
+    assert json.loads(legacy_body) == json.loads(fast_body), "serializers.py output differs from SiteResponse"
+
+    legacy_times, fast_times = [], []
+    for _ in range(ROUNDS):
+        t = time.perf_counter()
+        await _legacy(sites, field)
+        legacy_times.append(time.perf_counter() - t)
+        t = time.perf_counter()
+        _fast(sites)
+        fast_times.append(time.perf_counter() - t)
+
+    legacy_ms = min(legacy_times) * 1000
+    fast_ms = min(fast_times) * 1000
+    print(f"{SITES} sites / {SITES * PAGES_PER_SITE} pages, {len(fast_body) / 1024:.0f} KB, best of {ROUNDS}")
+    print(f"  pydantic + response_model + json : {legacy_ms:8.1f} ms")
+    print(f"  dict + orjson                    : {fast_ms:8.1f} ms")
+    print(f"  speedup                          : {legacy_ms / fast_ms:8.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
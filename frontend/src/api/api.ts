@@ -5,7 +5,7 @@
  * Set VITE_USE_MOCK=false in .env or .env.local to use the real backend.
  */
 
-import type { ISite, IPage, IDomain } from '@/types/site'
+import type { ISite, IPage, IPageBulkCreate, IDomain } from '@/types/site'
 import type { IBlock, IBlockTemplate } from '@/types/block'
 import type { DomainVerifyResult } from './real'
 
@@ -18,6 +18,7 @@ type CreateSite = (name: string, description?: string, isImported?: boolean) =>
 type UpdateSite = (siteId: string, data: Partial<ISite>) => Promise<ISite | null>
 type DeleteSite = (siteId: string) => Promise<boolean>
 type CreatePage = (siteId: string, title: string, slug: string) => Promise<IPage | null>
+type BulkCreatePages = (siteId: string, pages: IPageBulkCreate[]) => Promise<IPage[]>
 type UpdatePage = (siteId: string, pageId: string, data: Partial<IPage>) => Promise<IPage | null>
 type DeletePage = (siteId: string, pageId: string) => Promise<boolean>
 type FetchPageBlocks = (pageId: string) => Promise<IBlock[]>
@@ -38,6 +39,7 @@ let _createSite: CreateSite
 let _updateSite: UpdateSite
 let _deleteSite: DeleteSite
 let _createPage: CreatePage
+let _bulkCreatePages: BulkCreatePages
 let _updatePage: UpdatePage
 let _deletePage: DeletePage
 let _fetchPageBlocks: FetchPageBlocks
@@ -60,6 +62,7 @@ if (useMock) {
   _updateSite = m.updateSite
   _deleteSite = m.deleteSite
   _createPage = m.createPage
+  _bulkCreatePages = m.bulkCreatePages
   _updatePage = m.updatePage
   _deletePage = m.deletePage
   _fetchPageBlocks = m.fetchPageBlocks
@@ -81,6 +84,7 @@ if (useMock) {
   _updateSite = r.updateSite
   _deleteSite = r.deleteSite
   _createPage = r.createPage
+  _bulkCreatePages = r.bulkCreatePages
   _updatePage = r.updatePage
   _deletePage = r.deletePage
   _fetchPageBlocks = r.fetchPageBlocks
@@ -102,6 +106,7 @@ export const createSite = _createSite
 export const updateSite = _updateSite
 export const deleteSite = _deleteSite
 export const createPage = _createPage
+export const bulkCreatePages = _bulkCreatePages
 export const updatePage = _updatePage
 export const deletePage = _deletePage
 export const fetchPageBlocks = _fetchPageBlocks
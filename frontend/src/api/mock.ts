@@ -1,6 +1,6 @@
 // Mock data for sites API
 import { v4 as uuidv4 } from 'uuid'
-import type { ISite, IPage } from '@/types/site'
+import type { ISite, IPage, IPageBulkCreate } from '@/types/site'
 import type { IBlock, IBlockTemplate, BlockCategory } from '@/types/block'
 
 // Simulated delay for realistic behavior
@@ -700,6 +700,29 @@ export async function createPage(siteId: string, title: string, slug: string): P
   return JSON.parse(JSON.stringify(page))
 }
 
+export async function bulkCreatePages(siteId: string, pages: IPageBulkCreate[]): Promise<IPage[]> {
+  await delay()
+  const site = mockSites.find((s) => s.id === siteId)
+  if (!site) return []
+  const created: IPage[] = pages.map((p) => ({
+    id: uuidv4(),
+    siteId,
+    title: p.title,
+    slug: p.slug ?? '',
+    blocks: [],
+    htmlContent: p.htmlContent,
+    seo: { title: p.title, description: '', keywords: '' },
+    status: 'draft',
+    isMain: p.isMain || false,
+    isHomePage: p.isHomePage || false,
+    createdAt: new Date().toISOString(),
+    updatedAt: new Date().toISOString(),
+  }))
+  site.pages.push(...created)
+  persistSites()
+  return JSON.parse(JSON.stringify(created))
+}
+
 export async function deletePage(siteId: string, pageId: string): Promise<boolean> {
   await delay()
   const site = mockSites.find((s) => s.id === siteId)
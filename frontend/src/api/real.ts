@@ -4,7 +4,7 @@
  */
 
 import apiClient from './index'
-import type { ISite, IPage, IDomain } from '@/types/site'
+import type { ISite, IPage, IPageBulkCreate, IDomain } from '@/types/site'
 import type { IBlock, IBlockTemplate } from '@/types/block'
 
 // ========== Sites ==========
@@ -57,6 +57,11 @@ export async function createPage(siteId: string, title: string, slug: string): P
   }
 }
 
+export async function bulkCreatePages(siteId: string, pages: IPageBulkCreate[]): Promise<IPage[]> {
+  const { data } = await apiClient.post(`/sites/${siteId}/pages:bulkCreate`, { pages })
+  return data
+}
+
 export async function updatePage(siteId: string, pageId: string, updates: Partial<IPage>): Promise<IPage | null> {
   try {
     const { data } = await apiClient.patch(`/sites/${siteId}/pages/${pageId}`, updates)
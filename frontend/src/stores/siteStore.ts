@@ -1,8 +1,8 @@
 // Site store - manages current site data, pages, and global settings
 import { defineStore } from 'pinia'
 import { ref, computed } from 'vue'
-import type { ISite, IPage, ISiteGlobalSettings } from '@/types/site'
-import { fetchSites, fetchSite, createSite, updateSite, deleteSite, createPage, deletePage, updatePage, publishSite } from '@/api/api'
+import type { ISite, IPage, IPageBulkCreate, ISiteGlobalSettings } from '@/types/site'
+import { fetchSites, fetchSite, createSite, updateSite, deleteSite, createPage, bulkCreatePages, deletePage, updatePage, publishSite } from '@/api/api'
 import { slugify } from '@/utils/helpers'
 
 export const useSiteStore = defineStore('site', () => {
@@ -89,6 +89,14 @@ export const useSiteStore = defineStore('site', () => {
     return page
   }
 
+  /** Add many pages to current site in one request (ZIP import) */
+  async function addPages(siteId: string, pages: IPageBulkCreate[]) {
+    if (!currentSite.value || !pages.length) return []
+    const created = await bulkCreatePages(siteId, pages)
+    currentSite.value.pages.push(...created)
+    return created
+  }
+
   /** Remove a page */
   async function removePage(siteId: string, pageId: string) {
     if (!currentSite.value) return
@@ -143,6 +151,7 @@ export const useSiteStore = defineStore('site', () => {
     removeSite,
     updateGlobalSettings,
     addPage,
+    addPages,
     removePage,
     savePage,
     setCurrentPage,
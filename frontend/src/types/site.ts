@@ -24,6 +24,15 @@ export interface IPage {
   updatedAt: string
 }
 
+/** Page payload for bulk creation (ZIP import) */
+export interface IPageBulkCreate {
+  title: string
+  slug?: string
+  htmlContent?: string
+  isMain?: boolean
+  isHomePage?: boolean
+}
+
 export interface ISiteGlobalSettings {
   fonts?: {
     heading: string